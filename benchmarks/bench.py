@@ -0,0 +1,392 @@
+"""
+Benchmarks of the generated CRUD endpoints, the startup and the memory
+
+    python benchmarks/bench.py run --rows 10000 --output results.json
+    python benchmarks/bench.py compare baseline.json results.json --threshold 0.2
+    python benchmarks/bench.py run --output results.json --compare baseline.json
+
+'run' seeds a local aiosqlite database, generates a SimpleRouter and an
+ExtendedRouter with RouterMap (and a coalesced ExtendedRouter under
+'/coalesced') and requests every endpoint through httpx.ASGITransport.
+The startup (routers generation and OpenAPI schema) and its memory are
+measured in subprocesses with '--tables' mapped classes.
+'compare' exits with 1 when a metric regresses beyond the threshold.
+"""
+import argparse
+import asyncio
+import enum
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+LOWER_IS_BETTER = ["mean_ms", "p50_ms", "p95_ms", "generate_s", "openapi_s", "memory_peak_mb"]
+
+
+class Color(enum.Enum):
+    red = "red"
+    green = "green"
+    blue = "blue"
+
+
+def create_models(base, tables: int = 0):
+    """
+    the benchmark tables 'country' and 'people', or 'tables' generic tables
+    """
+    from sqlalchemy import Column, ForeignKey, Integer, String, Boolean, DateTime, Float, Enum
+    if tables:
+        return [
+            type(f"Table{i}", (base,), {
+                "__tablename__": f"table{i}",
+                "id": Column(Integer, primary_key=True),
+                "name": Column(String(100), nullable=False),
+                "count": Column(Integer),
+                "score": Column(Float),
+                "active": Column(Boolean, default=True),
+                "created": Column(DateTime),
+                "code": Column(String(20)),
+                "ref": Column(Integer, index=True),
+            })
+            for i in range(tables)
+        ]
+
+    class Country(base):
+        __tablename__ = "country"
+        id = Column(Integer, primary_key=True, autoincrement=True)
+        name = Column(String(100), nullable=False)
+
+    class People(base):
+        __tablename__ = "people"
+        id = Column(Integer, primary_key=True, autoincrement=True)
+        name = Column(String(100), nullable=False)
+        age = Column(Integer, index=True)
+        score = Column(Float)
+        isAlive = Column(Boolean, default=True)
+        color = Column(Enum(Color), default=Color.red)
+        created = Column(DateTime, default=datetime.utcnow)
+        country_id = Column(Integer, ForeignKey("country.id"))
+
+    return [Country, People]
+
+
+def summarize(durations: List[float], errors: int) -> Dict[str, float]:
+    durations = sorted(durations)
+    n = len(durations)
+    return {
+        "iterations": n,
+        "errors": errors,
+        "mean_ms": round(statistics.mean(durations) * 1000, 4),
+        "p50_ms": round(durations[n // 2] * 1000, 4),
+        "p95_ms": round(durations[min(n - 1, int(n * 0.95))] * 1000, 4),
+        "p99_ms": round(durations[min(n - 1, int(n * 0.99))] * 1000, 4),
+        "rps": round(n / sum(durations), 2),
+    }
+
+
+def succeeded(response) -> bool:
+    if response.status_code >= 400:
+        return False
+    if response.headers.get("content-type", "").startswith("application/json"):
+        return response.json()["status"]["code"] == 0
+    return True
+
+
+def endpoint_cases(rows: int, countries: int, batch: int) -> List[Tuple[str, float, Callable[[int], Union[dict, list]]]]:
+    """
+    (name, iterations factor, request of the n-th call), in the order they run:
+    the rows a case creates are the ones a later case updates or deletes.
+    A list of requests is sent concurrently and measured as a whole.
+    """
+    deepPage = max(1, rows // 20 // 2)
+    return [
+        ("country create", 1, lambda n: {"method": "POST", "url": "/country", "json": {"name": f"country-{n}"}}),
+        ("country read many", 1, lambda n: {"method": "GET", "url": "/country", "params": {"limit": 20}}),
+        ("country update", 1, lambda n: {
+            "method": "PUT", "url": f"/country/{1 + n % countries}", "json": {"name": f"updated-{n}"}
+        }),
+        ("country delete", 1, lambda n: {"method": "DELETE", "url": f"/country/{countries + 1 + n}"}),
+        ("people create one", 1, lambda n: {
+            "method": "POST", "url": "/people/one", "json": {"name": f"created-{n}", "age": n % 90}
+        }),
+        ("people create many", 1, lambda n: {
+            "method": "POST", "url": "/people",
+            "json": {"people": [{"name": f"batch-{n}", "age": i % 90} for i in range(batch)]}
+        }),
+        ("people read one", 1, lambda n: {"method": "GET", "url": "/people/one", "params": {"id": 1 + n % rows}}),
+        ("people read batch", 1, lambda n: {
+            "method": "GET", "url": "/people/batch",
+            "params": {"ids": ",".join(str(1 + (n * batch + i) % rows) for i in range(batch))}
+        }),
+        ("people read one coalesced", 1, lambda n: [
+            {"method": "GET", "url": "/coalesced/people/one", "params": {"id": 1 + (n * batch + i) % rows}}
+            for i in range(batch)
+        ]),
+        ("people read one concurrent", 1, lambda n: [
+            {"method": "GET", "url": "/people/one", "params": {"id": 1 + (n * batch + i) % rows}}
+            for i in range(batch)
+        ]),
+        ("people read many", 1, lambda n: {"method": "GET", "url": "/people", "params": {"limit": 20}}),
+        ("people read many deep page", 1, lambda n: {
+            "method": "GET", "url": "/people", "params": {"limit": 20, "page": deepPage}
+        }),
+        ("people read many filtered", 1, lambda n: {
+            "method": "GET", "url": "/people", "params": {"limit": 20, "age": n % 90}
+        }),
+        ("people read many fields", 1, lambda n: {
+            "method": "GET", "url": "/people", "params": {"limit": 100, "fields": "id,name"}
+        }),
+        ("people count", 1, lambda n: {"method": "HEAD", "url": "/people"}),
+        ("people export", 0.1, lambda n: {"method": "GET", "url": "/people/export"}),
+        ("people update one", 1, lambda n: {
+            "method": "PUT", "url": f"/people/{1 + n % rows}", "json": {"name": f"updated-{n}"}
+        }),
+        ("people update many", 1, lambda n: {
+            "method": "PUT", "url": "/people", "params": {"reference_key": "id"},
+            "json": {"people": [{"id": 1 + (n * batch + i) % rows, "name": f"updated-{n}"} for i in range(batch)]}
+        }),
+        ("people delete one", 1, lambda n: {"method": "DELETE", "url": f"/people/{rows - n}"}),
+        ("people delete many", 1, lambda n: {"method": "DELETE", "url": "/people", "params": {"name": f"batch-{n}"}}),
+    ]
+
+
+async def bench_endpoints(args) -> Dict[str, Dict[str, float]]:
+    import httpx
+    from fastapi import FastAPI
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.ext.declarative import declarative_base
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from fastapi_simple_crud import RouterMap, SimpleRouter, ExtendedRouter
+    from fastapi_simple_crud.simpleCRUD import SimpleCRUDGenerator
+
+    directory = tempfile.mkdtemp(prefix="simplecrud-bench-")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{directory}/bench.db", future=True)
+    sessionMaker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    Base = declarative_base()
+    Country, People = create_models(Base)
+
+    async def get_session() -> AsyncSession:
+        async with sessionMaker() as session:
+            yield session
+
+    countries = max(1, args.rows // 100)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(Country.__table__.insert(), [{"name": f"country-{i}"} for i in range(countries)])
+        for start in range(0, args.rows, 1000):
+            await conn.execute(People.__table__.insert(), [
+                {
+                    "name": f"people-{i}", "age": i % 90, "score": i / 7, "isAlive": bool(i % 2),
+                    "color": list(Color)[i % 3], "created": datetime(2022, 1, 1),
+                    "country_id": 1 + i % countries,
+                }
+                for i in range(start, min(start + 1000, args.rows))
+            ])
+
+    app = FastAPI()
+
+    class BenchMap(RouterMap):
+        country = SimpleRouter(Country)
+        people = ExtendedRouter(People)
+
+    RouterMap.generate(app, get_session)
+
+    # the same table with coalesced read one, the concurrent reads are merged into 'IN' queries
+    coalescedApp = FastAPI()
+    generator = SimpleCRUDGenerator(coalescedApp, get_session, autogenerate=False)
+    generator.allRouters = {"people": ExtendedRouter(People, coalesce_window=args.coalesce_window)}
+    generator.generate_router()
+    app.mount("/coalesced", coalescedApp)
+
+    async def send(client, request):
+        if isinstance(request, list):
+            responses = await asyncio.gather(*[client.request(**r) for r in request])
+            return sum(not succeeded(r) for r in responses)
+        return not succeeded(await client.request(**request))
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, factor, request in endpoint_cases(args.rows, countries, args.batch):
+                if args.only and not any(o in name for o in args.only):
+                    continue
+                calls = itertools.count()
+                for _ in range(args.warmup):
+                    await send(client, request(next(calls)))
+                durations, errors = [], 0
+                for _ in range(max(1, int(args.iterations * factor))):
+                    kwargs = request(next(calls))
+                    start = time.perf_counter()
+                    errors += await send(client, kwargs)
+                    durations.append(time.perf_counter() - start)
+                results[name] = summarize(durations, errors)
+                print(f"{name:30} {results[name]['p50_ms']:9.3f} ms p50 {results[name]['rps']:9.1f} req/s"
+                      + (f" ({errors} errors)" if errors else ""), file=sys.stderr)
+    finally:
+        await engine.dispose()
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def bench_startup(tables: int, memory: bool) -> Dict[str, float]:
+    from fastapi import FastAPI
+    from sqlalchemy.ext.declarative import declarative_base
+    from fastapi_simple_crud import RouterMap
+
+    Base = declarative_base()
+    models = create_models(Base, tables)
+
+    async def get_session():
+        yield None
+
+    app = FastAPI()
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    RouterMap.create_router_map_from_base(Base, extend=True)
+    RouterMap.generate(app, get_session)
+    generated = time.perf_counter()
+    app.openapi()
+    rendered = time.perf_counter()
+    if memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            "memory_mb": round(current / 2**20, 3),
+            "memory_peak_mb": round(peak / 2**20, 3),
+        }
+    return {
+        "tables": len(models),
+        "routes": len(app.routes),
+        "generate_s": round(generated - start, 4),
+        "openapi_s": round(rendered - generated, 4),
+    }
+
+
+def run_startup(tables: int) -> Dict[str, float]:
+    """
+    every measure runs in a fresh interpreter, tracemalloc slows the generation
+    so the time and the memory are measured separately
+    """
+    result = {}
+    for memory in [False, True]:
+        command = [sys.executable, os.path.abspath(__file__), "startup", "--tables", str(tables)]
+        if memory:
+            command.append("--memory")
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        result.update(json.loads(output))
+    return result
+
+
+def versions() -> Dict[str, str]:
+    import fastapi, pydantic, sqlalchemy, starlette
+    return {
+        "python": platform.python_version(),
+        "fastapi": fastapi.__version__,
+        "starlette": starlette.__version__,
+        "pydantic": pydantic.VERSION,
+        "sqlalchemy": sqlalchemy.__version__,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """
+    the regressions of 'current' against 'baseline', a metric regresses when
+    it is 'threshold' (ratio) above its baseline
+    """
+    regressions = []
+    sections = [
+        ({"startup": baseline.get("startup", {})}, {"startup": current.get("startup", {})}),
+        (baseline.get("endpoints", {}), current.get("endpoints", {})),
+    ]
+    for old, new in sections:
+        for name in sorted(set(old) & set(new)):
+            for metric in LOWER_IS_BETTER:
+                if metric not in old[name] or metric not in new[name] or not old[name][metric]:
+                    continue
+                ratio = new[name][metric] / old[name][metric]
+                line = f"{name:30} {metric:15} {old[name][metric]:12.4f} -> {new[name][metric]:12.4f} ({ratio - 1:+.1%})"
+                if ratio > 1 + threshold:
+                    regressions.append(line)
+                    line += " REGRESSION"
+                print(line)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="fastapi_simple_crud benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks")
+    run.add_argument("--rows", type=int, default=1000, help="seeded rows of the people table")
+    run.add_argument("--iterations", type=int, default=200, help="requests per endpoint")
+    run.add_argument("--warmup", type=int, default=10, help="requests per endpoint before measuring")
+    run.add_argument("--batch", type=int, default=20, help="rows per create many, update many and batch read request")
+    run.add_argument("--coalesce-window", type=float, default=0.002, help="seconds of the coalesced read one window")
+    run.add_argument("--tables", type=int, default=50, help="mapped classes of the startup benchmark, 0 to skip it")
+    run.add_argument("--only", nargs="*", help="run the endpoints whose name contains one of these")
+    run.add_argument("--output", help="write the results JSON here (default stdout)")
+    run.add_argument("--compare", help="baseline results JSON to compare with")
+    run.add_argument("--threshold", type=float, default=0.2, help="allowed regression ratio")
+
+    startup = commands.add_parser("startup", help="(internal) measure the startup in this process")
+    startup.add_argument("--tables", type=int, default=50)
+    startup.add_argument("--memory", action="store_true")
+
+    comparison = commands.add_parser("compare", help="compare two results JSON")
+    comparison.add_argument("baseline")
+    comparison.add_argument("current")
+    comparison.add_argument("--threshold", type=float, default=0.2, help="allowed regression ratio")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "startup":
+        print(json.dumps(bench_startup(args.tables, args.memory)))
+        return
+
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    results = {
+        "meta": {
+            "date": datetime.utcnow().isoformat(),
+            "versions": versions(),
+            "rows": args.rows,
+            "iterations": args.iterations,
+            "batch": args.batch,
+        },
+        "startup": run_startup(args.tables) if args.tables else {},
+        "endpoints": asyncio.run(bench_endpoints(args)),
+    }
+    body = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(body + "\n")
+    else:
+        print(body)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(baseline, results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+from .codegen import main
+
+
+main()
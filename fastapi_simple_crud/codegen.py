@@ -0,0 +1,422 @@
+"""
+Generate static router modules from a SQLAlchemy declarative base
+
+    python -m fastapi_simple_crud.codegen myapp.models:Base myapp/crud --session myapp.db:get_session
+
+every mapped class gets a module with explicit pydantic models and endpoint
+functions, the package exposes 'routers' and 'include_routers(app)'
+"""
+import argparse
+import enum
+import importlib
+import os
+import re
+import sys
+from datetime import datetime
+from string import Template
+from typing import Dict, List, Optional
+
+from .dependencies.metadata import ColumnMetadata, ModelMetadata, get_model_metadata
+
+
+HEADER = '''"""
+generated by fastapi_simple_crud.codegen from $source, do not edit
+"""
+'''
+
+IMPORTS = '''from typing import Any, List, Optional
+from fastapi import APIRouter, Body, Depends, Path, Query, Request
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import Response, StreamingResponse
+
+from fastapi_simple_crud.dependencies.utils import BaseCRUD, create_response, status
+from fastapi_simple_crud.dependencies.utils import ExportFormat, ExportMediaTypes
+from fastapi_simple_crud.dependencies.utility import CommonQueryGetter, CommonQuerySelectFields, CommonQueryExport
+from fastapi_simple_crud.dependencies.utility import CommonQueryBatch
+from fastapi_simple_crud.dependencies.response import FastJSONResponse, fast_response
+from fastapi_simple_crud.dependencies.serializer import ResponseStatus, ResponsePageMeta
+'''
+
+MODELS = '''
+
+class ${name}PydanticRowList(BaseModel):
+    list: List[${name}PydanticRow] = []
+
+
+class ${name}PydanticResponseOne(BaseModel):
+    data: Optional[${name}PydanticRow] = None
+    meta: dict = {}
+    status: ResponseStatus
+
+
+class ${name}PydanticResponseMany(BaseModel):
+    data: ${name}PydanticRowList
+    meta: ResponsePageMeta
+    status: ResponseStatus
+
+
+class ${name}PydanticRowBatch(BaseModel):
+    list: List[${name}PydanticRow] = []
+    missing: List[Any] = []
+
+
+class ${name}PydanticResponseBatch(BaseModel):
+    data: Optional[${name}PydanticRowBatch] = None
+    meta: dict = {}
+    status: ResponseStatus
+
+
+class ${name}PydanticSimpleCreateMany(BaseModel):
+    ${tablename}: Optional[List[${name}PydanticSimpleCreate]] = None
+
+
+class ${name}PydanticSimpleUpdateMany(BaseModel):
+    ${tablename}: Optional[List[${name}PydanticSimpleCreate]] = None
+
+
+class ${name}PydanticSimpleReadOne(BaseModel):
+    id: int = Query(...)
+
+
+router = APIRouter(prefix="${prefix}", tags=["${tablename}"], default_response_class=FastJSONResponse)
+crud = BaseCRUD(${className})
+'''
+
+READ_MANY = '''
+
+@router.get("", name="read many ${tablename}", responses={200: {"model": ${name}PydanticResponseMany}})
+async def read_many(
+        request: Request,
+        readParams: ${name}PydanticSimpleQuery = Depends(),
+        getParams: CommonQueryGetter = Depends(),
+        session: AsyncSession = Depends(get_session)
+    ):
+    wc = crud.where(**readParams.dict())
+    return fast_response(await crud.read_many(getParams, session, wc))
+
+
+@router.head("", name="count ${tablename}")
+async def count_many(
+        request: Request,
+        readParams: ${name}PydanticSimpleQuery = Depends(),
+        getParams: CommonQueryGetter = Depends(),
+        session: AsyncSession = Depends(get_session)
+    ):
+    wc = crud.where(**readParams.dict())
+    res = await crud.count_many(getParams, session, wc)
+    if res["status"]["code"] != 0:
+        return Response(status_code=400)
+    return Response(headers={"X-Total-Count": str(res["meta"]["total"])})
+'''
+
+UPDATE_ONE = '''
+
+@router.put("/{id}", name="update one ${tablename}", responses={200: {"model": ${name}PydanticResponseOne}})
+async def update_one(
+        request: Request,
+        modelPydantic: ${name}PydanticSimpleUpdate,
+        id: int = Path(...),
+        session: AsyncSession = Depends(get_session)
+    ):
+    return fast_response(await crud.update(modelPydantic, id, session))
+'''
+
+DELETE_ONE = '''
+
+@router.delete("/{id}", name="delete one ${tablename}")
+async def delete_one(
+        request: Request,
+        id: int = Path(..., min=1),
+        session: AsyncSession = Depends(get_session)
+    ):
+    return fast_response(await crud.delete(id, session))
+'''
+
+SIMPLE_ENDPOINTS = '''
+
+@router.post("", name="create ${tablename}", responses={200: {"model": ${name}PydanticResponseOne}})
+async def create(
+        request: Request,
+        modelPydantic: ${name}PydanticSimpleCreate,
+        selectFields: CommonQuerySelectFields = Depends(),
+        session: AsyncSession = Depends(get_session)
+    ):
+    res = await crud.create(modelPydantic, session, selectFields.fields, bool(selectFields.fields))
+    return fast_response(res)
+''' + READ_MANY + UPDATE_ONE + DELETE_ONE
+
+EXTENDED_ENDPOINTS = '''
+
+@router.post("/one", name="create one ${tablename}", responses={200: {"model": ${name}PydanticResponseOne}})
+async def create_one(
+        request: Request,
+        modelPydantic: ${name}PydanticSimpleCreate,
+        selectFields: CommonQuerySelectFields = Depends(),
+        session: AsyncSession = Depends(get_session)
+    ):
+    res = await crud.create(modelPydantic, session, selectFields.fields, bool(selectFields.fields))
+    return fast_response(res)
+
+
+@router.post("", name="create many ${tablename}")
+async def create_many(
+        request: Request,
+        modelPydantic: ${name}PydanticSimpleCreateMany,
+        selectFields: CommonQuerySelectFields = Depends(),
+        session: AsyncSession = Depends(get_session)
+    ):
+    res = await crud.create_many(modelPydantic, session, selectFields.fields, bool(selectFields.fields))
+    return fast_response(res)
+
+
+@router.get("/one", name="read one ${tablename}", responses={200: {"model": ${name}PydanticResponseOne}})
+async def read_one(
+        request: Request,
+        modelPydantic: ${name}PydanticSimpleReadOne = Depends(),
+        selectFields: CommonQuerySelectFields = Depends(),
+        session: AsyncSession = Depends(get_session)
+    ):
+    return fast_response(await crud.read_one(modelPydantic, session, selectFields.fields))
+
+
+@router.get("/batch", name="read batch ${tablename}", responses={200: {"model": ${name}PydanticResponseBatch}})
+async def read_batch(
+        request: Request,
+        batchParams: CommonQueryBatch = Depends(),
+        session: AsyncSession = Depends(get_session)
+    ):
+    return fast_response(await crud.read_batch(batchParams.ids, session, batchParams.fields))
+''' + READ_MANY + '''
+
+@router.get("/export", name="export ${tablename}")
+async def export(
+        request: Request,
+        readParams: ${name}PydanticSimpleQuery = Depends(),
+        exportParams: CommonQueryExport = Depends(),
+        session: AsyncSession = Depends(get_session)
+    ):
+    if exportParams.format not in ExportMediaTypes:
+        return fast_response(create_response(status=status.error(
+            f"Invalid export format '{exportParams.format}', use one of {list(ExportMediaTypes)}"
+        )))
+    wc = crud.where(**readParams.dict())
+    headers = None
+    if exportParams.format == ExportFormat.csv:
+        headers = {"Content-Disposition": 'attachment; filename="${tablename}.csv"'}
+    return StreamingResponse(
+        crud.export(exportParams, session, wc),
+        media_type=ExportMediaTypes[exportParams.format],
+        headers=headers
+    )
+''' + UPDATE_ONE + '''
+
+@router.put("", name="update many ${tablename}")
+async def update_many(
+        request: Request,
+        pydanticModelCollection: ${name}PydanticSimpleUpdateMany,
+        reference_key: str = Query(
+            ...,
+            description="Put your reference key that will be used to refer your data and won't be updated"
+            ),
+        session: AsyncSession = Depends(get_session)
+    ):
+    return fast_response(await crud.update_many(pydanticModelCollection, reference_key, session))
+''' + DELETE_ONE + '''
+
+@router.delete("", name="delete many ${tablename}")
+async def delete_many(
+        request: Request,
+        deleteParams: ${name}PydanticSimpleQuery = Depends(),
+        session: AsyncSession = Depends(get_session)
+    ):
+    return fast_response(await crud.delete_many(deleteParams, session))
+'''
+
+PACKAGE = '''from fastapi import FastAPI
+
+$imports
+
+routers = [$routers]
+
+
+def include_routers(app: FastAPI):
+    for router in routers:
+        app.include_router(router)
+'''
+
+
+def import_object(path: str):
+    """
+    import 'module.path:attribute'
+    """
+    moduleName, _, attribute = path.partition(":")
+    obj = importlib.import_module(moduleName)
+    for name in attribute.split(".") if attribute else []:
+        obj = getattr(obj, name)
+    return obj
+
+
+def identifier(name: str) -> str:
+    name = re.sub(r"\W", "_", name)
+    return "_" + name if name[:1].isdigit() else name
+
+
+class ModuleWriter:
+    """
+    source of the router module of a mapped class
+    """
+
+    def __init__(self, classModel, sessionGetter: str, prefix: str = "", extend: bool = False):
+        self.classModel = classModel
+        self.metadata: ModelMetadata = get_model_metadata(classModel)
+        self.tablename = self.metadata.tablename
+        self.name = identifier(self.tablename)
+        self.sessionGetter = sessionGetter
+        self.prefix = prefix + "/" + self.tablename
+        self.extend = extend
+        self.imports: Dict[str, set] = {}
+
+    def add_import(self, module: str, name: str):
+        self.imports.setdefault(module, set()).add(name)
+
+    def render_type(self, column: ColumnMetadata, optional: bool = False) -> str:
+        pythonType = column.pythonType
+        if pythonType is None:
+            return "Any"
+        if pythonType in [str, int, float, bool]:
+            text = pythonType.__name__
+        elif pythonType is datetime:
+            self.add_import("datetime", "datetime")
+            text = "datetime"
+        elif issubclass(pythonType, enum.Enum):
+            self.add_import(pythonType.__module__, pythonType.__qualname__.split(".")[0])
+            text = pythonType.__qualname__
+        else:
+            raise ValueError(f"Unsupported type {pythonType} of '{self.tablename}.{column.key}'")
+        if optional or column.nullable:
+            text = f"Optional[{text}]"
+        return text
+
+    def render_default(self, value) -> str:
+        if isinstance(value, enum.Enum):
+            return f"{type(value).__qualname__}.{value.name}"
+        return repr(value)
+
+    def render_model(self, modelName: str, exclude: List[str] = [], query: bool = False) -> str:
+        lines = [f"class {modelName}(BaseModel):"]
+        for key, column in self.metadata.columns.items():
+            if key in exclude or column.annotation is None:
+                continue
+            default = self.render_default(column.defaultValue)
+            if query:
+                default = f"Query(default={default})"
+            lines.append(f"    {key}: {self.render_type(column)} = {default}")
+        if len(lines) == 1:
+            lines.append("    pass")
+        return "\n".join(lines) + "\n"
+
+    def render_row_model(self) -> str:
+        lines = [f"class {self.name}PydanticRow(BaseModel):"]
+        for key, column in self.metadata.columns.items():
+            lines.append(f"    {key}: {self.render_type(column, optional=True)} = None")
+        if len(lines) == 1:
+            lines.append("    pass")
+        return "\n".join(lines) + "\n"
+
+    def render(self) -> str:
+        source = f"{self.classModel.__module__}.{self.classModel.__qualname__}"
+        self.add_import(self.classModel.__module__, self.classModel.__name__)
+        models = "\n\n".join([
+            self.render_model(f"{self.name}PydanticSimpleCreate"),
+            self.render_model(f"{self.name}PydanticSimpleUpdate", exclude=["id"]),
+            self.render_model(f"{self.name}PydanticSimpleQuery", query=True),
+            self.render_row_model(),
+        ])
+        values = {
+            "name": self.name,
+            "tablename": self.tablename,
+            "prefix": self.prefix,
+            "className": self.classModel.__name__,
+            "source": source,
+        }
+        endpoints = EXTENDED_ENDPOINTS if self.extend else SIMPLE_ENDPOINTS
+        imports = [
+            f"from {module} import {', '.join(sorted(names))}"
+            for module, names in sorted(self.imports.items())
+        ]
+        moduleName, _, getter = self.sessionGetter.partition(":")
+        imports.append(f"from {moduleName} import {getter} as get_session")
+        imports = "\n".join(imports)
+        return (
+            Template(HEADER).substitute(values)
+            + IMPORTS
+            + imports + "\n\n\n"
+            + models
+            + Template(MODELS).substitute(values)
+            + Template(endpoints).substitute(values)
+        )
+
+
+def generate_modules(
+        base,
+        output: str,
+        session_getter: str,
+        base_prefix: str = "",
+        extend: bool = False
+    ) -> List[str]:
+    """
+    Write a router module per mapped class of the declarative base and the package
+    '__init__.py' listing their routers
+
+    :params:
+    - base -> SQLAlchemy declarative base
+    - output -> directory of the generated package
+    - session_getter -> 'module:attribute' of the AsyncSession getter/yielder
+    - base_prefix -> Base prefix path for all endpoints in one router
+    - extend -> generate the ExtendedRouter endpoints
+
+    return the written file paths
+    """
+    os.makedirs(output, exist_ok=True)
+    written = []
+    modules = []
+    for classModel in sorted(base.__subclasses__(), key=lambda c: c.__tablename__):
+        if classModel.__module__ == "__main__":
+            raise ValueError(f"'{classModel.__name__}' must be importable, it is defined in __main__")
+        writer = ModuleWriter(classModel, session_getter, base_prefix, extend)
+        path = os.path.join(output, writer.name + ".py")
+        with open(path, "w") as f:
+            f.write(writer.render())
+        written.append(path)
+        modules.append(writer.name)
+    path = os.path.join(output, "__init__.py")
+    with open(path, "w") as f:
+        f.write(Template(PACKAGE).substitute(
+            imports="\n".join(f"from . import {m}" for m in modules),
+            routers=", ".join(f"{m}.router" for m in modules),
+        ))
+    written.append(path)
+    return written
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="fastapi-simple-crud",
+        description="Generate static router modules from a SQLAlchemy declarative base"
+    )
+    parser.add_argument("base", help="declarative base, ex: myapp.models:Base")
+    parser.add_argument("output", help="directory of the generated package")
+    parser.add_argument("--session", required=True, help="AsyncSession getter, ex: myapp.db:get_session")
+    parser.add_argument("--prefix", default="", help="base prefix path of all routers")
+    parser.add_argument("--extend", action="store_true", help="generate the ExtendedRouter endpoints")
+    args = parser.parse_args(argv)
+    sys.path.insert(0, os.getcwd())
+    base = import_object(args.base)
+    written = generate_modules(base, args.output, args.session, args.prefix, args.extend)
+    for path in written:
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
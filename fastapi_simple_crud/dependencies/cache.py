@@ -0,0 +1,145 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from .response import json_default
+from .log import logger
+
+
+class CacheBackend:
+    """
+    Interface of the result cache storage, every method is a coroutine so a
+    network cache (Redis, Memcached, ...) can implement it
+
+    - get(key) -> stored bytes or None
+    - set(key, value, ttl) -> store bytes for 'ttl' seconds
+    - incr(key) -> increment the counter of the key and return it (no expiry)
+    """
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In process LRU cache with expiry, counters are never evicted
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._counters = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if key in self._counters:
+            return self._counters[key]
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expiry, value = entry
+        if expiry is not None and expiry < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        expiry = time.monotonic() + ttl if ttl else None
+        self._entries[key] = (expiry, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    def clear(self):
+        self._entries.clear()
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Adaptor of an async Redis compatible client (e.g. redis.asyncio.Redis),
+    the client is duck typed so redis is not a dependency of this package
+    """
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        if ttl:
+            await self.client.set(key, value, px=int(ttl * 1000))
+        else:
+            await self.client.set(key, value)
+
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(key)
+
+
+def normalize_params(params: dict) -> str:
+    """
+    canonical JSON of the parameters of a read, None values are left out
+    """
+    params = {k: v for k, v in params.items() if v is not None}
+    return json.dumps(params, sort_keys=True, default=json_default, separators=(",", ":"))
+
+
+class ResultCache:
+    """
+    Read through cache of the encoded responses.
+
+    Every table has a version counter which is bumped by the writes of BaseCRUD,
+    the version is part of the key so a write makes the cached reads of its table
+    unreachable, they expire by themselves afterwards.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = 60, prefix: str = "simplecrud"):
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _version_key(self, tablename: str) -> str:
+        return f"{self.prefix}:version:{tablename}"
+
+    async def version(self, tablename: str) -> int:
+        version = await self.backend.get(self._version_key(tablename))
+        return int(version) if version else 0
+
+    async def key(self, tablename: str, operation: str, params: dict) -> str:
+        """
+        key of the table, operation and normalized parameters (None values are left out)
+        """
+        digest = hashlib.sha1(normalize_params(params).encode()).hexdigest()
+        version = await self.version(tablename)
+        return f"{self.prefix}:{tablename}:{version}:{operation}:{digest}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"result cache is not available: {e}")
+            return None
+
+    async def set(self, key: str, value: bytes):
+        try:
+            await self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            logger.warning(f"result cache is not available: {e}")
+
+    async def invalidate(self, tablename: str):
+        try:
+            await self.backend.incr(self._version_key(tablename))
+        except Exception as e:
+            logger.error(f"result cache of '{tablename}' is not invalidated: {e}")
@@ -0,0 +1,143 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+
+def session_configuration(session: AsyncSession) -> Optional[tuple]:
+    """
+    what a dedicated session needs to read as the session does: its class, its
+    engine (execution options included), its sync session class and its info.
+
+    None when a dedicated session can not reproduce it: the session is bound to
+    a Connection (ex: a test transaction) or it already began a transaction
+    (ex: a 'SET' of the tenant or of a RLS policy made by the session getter)
+    """
+    bind = getattr(session, "bind", None)
+    if not isinstance(bind, AsyncEngine) or session.in_transaction():
+        return None
+    try:
+        info = tuple(sorted(session.info.items()))
+        hash(info)
+    except TypeError:
+        return None
+    return (type(session), bind, session.sync_session_class, info)
+
+
+def dedicated_session(configuration: tuple) -> AsyncSession:
+    """
+    new session made by the configuration of 'session_configuration'
+    """
+    sessionClass, bind, syncSessionClass, info = configuration
+    return sessionClass(bind, sync_session_class=syncSessionClass, info=dict(info))
+
+
+class KeyBatch:
+    """
+    keys requested during a window by sessions of the same configuration
+    """
+
+    def __init__(self, configuration: tuple):
+        self.configuration = configuration
+        self.futures: Dict[Any, asyncio.Future] = {}
+
+
+class ReadOneCoalescer:
+    """
+    Merge the concurrent reads by primary key of a table, arriving within
+    'window' seconds, into a single 'IN' query (like a DataLoader)
+
+    - load -> coroutine (session, fields, keys) returning the rows by key
+    - window -> seconds a batch waits for more keys
+    - max_batch -> a batch is loaded right away when it has this many keys
+
+    the reads are grouped by the configuration of their session and by their
+    fields, a batch is loaded by a session of its own so a cancelled read (and
+    its closed session) does not fail the others. Only the sessions a dedicated
+    session can reproduce are coalesced (see 'session_configuration')
+    """
+
+    def __init__(
+            self,
+            load: Callable[[AsyncSession, List[str], List[Any]], Awaitable[Dict[Any, dict]]],
+            window: float = 0.002,
+            max_batch: int = 500
+        ):
+        self.load = load
+        self.window = window
+        self.maxBatch = max_batch
+        self._batches: Dict[Tuple[Any, tuple], KeyBatch] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def can_coalesce(self, session: AsyncSession) -> bool:
+        return session_configuration(session) is not None
+
+    async def get(self, session: AsyncSession, fields: List[str], key) -> Optional[dict]:
+        """
+        the row of the key (projected by the fields), None when it does not exist
+        """
+        configuration = session_configuration(session)
+        group = (configuration, tuple(fields))
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(group)
+        if batch is None:
+            batch = self._batches[group] = KeyBatch(configuration)
+            loop.call_later(self.window, self._dispatch, group, batch)
+        future = batch.futures.get(key)
+        if future is None:
+            future = batch.futures[key] = loop.create_future()
+            if len(batch.futures) >= self.maxBatch:
+                self._dispatch(group, batch)
+        # a cancelled read does not cancel the others waiting for the same key
+        return await asyncio.shield(future)
+
+    def _dispatch(self, group: Tuple[Any, tuple], batch: KeyBatch):
+        if self._batches.get(group) is not batch:
+            return
+        del self._batches[group]
+        task = asyncio.ensure_future(self._load(batch, list(group[1])))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _load(self, batch: KeyBatch, fields: List[str]):
+        try:
+            async with dedicated_session(batch.configuration) as session:
+                rows = await self.load(session, fields, list(batch.futures))
+        except Exception as e:
+            for future in batch.futures.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch.futures.items():
+            if not future.done():
+                future.set_result(rows.get(key))
+
+
+class SingleFlight:
+    """
+    Share the in-flight execution of identical reads: the concurrent calls of
+    the same key await the result of the first one instead of querying again.
+    The key is released as soon as its execution finishes, nothing is cached.
+
+    The execution is a task of its own shielded from the callers, a cancelled
+    caller does not cancel it. 'call' must not use resources of the first caller
+    (ex: its request session), they can be released while the others wait.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]):
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = asyncio.ensure_future(call())
+            flight.add_done_callback(lambda f: self._release(key, f))
+        # a cancelled call does not cancel the execution shared by the others
+        return await asyncio.shield(flight)
+
+    def _release(self, key: Hashable, flight: asyncio.Future):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
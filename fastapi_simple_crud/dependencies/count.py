@@ -0,0 +1,200 @@
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Optional, Sequence
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql.selectable import Select
+from sqlalchemy import func, text
+
+from .log import logger
+
+
+class CountStrategy:
+    """
+    available strategies to count the total rows of a paginated query
+    """
+    exact = "exact"
+    none = "none"
+    estimated = "estimated"
+    cached = "cached"
+    window = "window"
+
+
+CountStrategies = [
+    v for k, v in vars(CountStrategy).items() if not "_" in [k[0], k[-1]]
+]
+
+
+def validate_count_strategy(strategy: str) -> str:
+    if strategy not in CountStrategies:
+        raise ValueError(
+            f"Invalid count strategy '{strategy}', use one of {CountStrategies}"
+        )
+    return strategy
+
+
+class CountCache:
+    """
+    Memoize exact counts per query signature.
+
+    Every table has a version which is bumped on writes, the versions are part
+    of the key so a write makes the previous counts of that table unreachable.
+    """
+
+    def __init__(self, ttl: float = 60, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._versions = {}
+
+    def key(self, query: Select, tables: Sequence[str]):
+        compiled = query.compile()
+        versions = tuple((t, self._versions.get(t, 0)) for t in tables)
+        return (str(compiled), repr(sorted(compiled.params.items())), versions)
+
+    def get(self, key) -> Optional[int]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expiry, value = entry
+        if expiry < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value: int):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, tablename: str):
+        self._versions[tablename] = self._versions.get(tablename, 0) + 1
+
+    def clear(self):
+        self._entries.clear()
+
+
+countCache = CountCache()
+"""
+- process wide cache used by the 'cached' count strategy
+- BaseCRUD writes invalidate the counts of their table
+"""
+
+
+def window_count_column():
+    """
+    total rows of the query counted in the same statement as the page
+    """
+    return func.count().over().label("_simplecrud_total")
+
+
+async def count_exact(session: AsyncSession, query: Select) -> int:
+    data = await session.execute(select(func.count()).select_from(query.subquery()))
+    return data.scalars().one()
+
+
+async def count_cached(
+        session: AsyncSession,
+        query: Select,
+        tables: Sequence[str],
+        cache: Optional[CountCache] = None
+    ) -> int:
+    if cache is None:
+        cache = countCache
+    key = cache.key(query, tables)
+    total = cache.get(key)
+    if total is None:
+        total = await count_exact(session, query)
+        cache.set(key, total)
+    return total
+
+
+async def _estimate(
+        session: AsyncSession,
+        query: Select,
+        tables: Sequence[str],
+        dialect
+    ) -> Optional[int]:
+    unfiltered = query.whereclause is None and len(tables) == 1
+    if dialect.name == "postgresql":
+        compiled = query.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        plan = await session.execute(text("EXPLAIN (FORMAT JSON) " + str(compiled)))
+        plan = plan.scalars().first()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    if dialect.name == "sqlite" and unfiltered:
+        stat = await session.execute(
+            text("SELECT stat FROM sqlite_stat1 WHERE tbl = :tbl"),
+            {"tbl": tables[0]}
+        )
+        stat = stat.scalars().first()
+        if stat:
+            return int(re.match(r"\d+", stat).group())
+    if dialect.name in ["mysql", "mariadb"] and unfiltered:
+        stat = await session.execute(
+            text(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tbl"
+            ),
+            {"tbl": tables[0]}
+        )
+        stat = stat.scalars().first()
+        if stat is not None:
+            return int(stat)
+    return None
+
+
+async def count_estimated(
+        session: AsyncSession,
+        query: Select,
+        tables: Sequence[str]
+    ) -> Optional[int]:
+    """
+    estimated count from the planner statistics
+
+    - postgresql -> row estimation of the query plan
+    - sqlite -> sqlite_stat1 (needs ANALYZE), only for unfiltered single table queries
+    - mysql -> information_schema, only for unfiltered single table queries
+
+    the estimation runs inside a savepoint, a failing probe (ex: sqlite_stat1
+    does not exist) does not abort the transaction of the session
+
+    return None when no estimation is available
+    """
+    connection = await session.connection()
+    try:
+        async with session.begin_nested():
+            return await _estimate(session, query, tables, connection.dialect)
+    except Exception as e:
+        logger.warning(f"count estimation is not available: {e}")
+    return None
+
+
+async def count_query(
+        session: AsyncSession,
+        query: Select,
+        strategy: str,
+        tables: Sequence[str],
+        cache: Optional[CountCache] = None
+    ) -> Optional[int]:
+    """
+    count the rows of the query by using the given strategy
+
+    - 'estimated' falls back to an exact count when the database has no estimation
+    - 'window' is counted together with the page by the paginator, here it is exact
+    """
+    validate_count_strategy(strategy)
+    if strategy == CountStrategy.none:
+        return None
+    if strategy == CountStrategy.cached:
+        return await count_cached(session, query, tables, cache)
+    if strategy == CountStrategy.estimated:
+        total = await count_estimated(session, query, tables)
+        if total is not None:
+            return total
+    return await count_exact(session, query)
@@ -0,0 +1,117 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import inspect, Column
+from sqlalchemy.sql import sqltypes
+from sqlalchemy.types import TypeDecorator
+
+
+def get_python_type(columnType) -> Optional[type]:
+    """
+    python type of the supported SQLAlchemy column types, None for the others
+    """
+    while isinstance(columnType, TypeDecorator):
+        columnType = columnType.impl
+    if isinstance(columnType, sqltypes.Enum) and columnType.enum_class:
+        return columnType.enum_class
+    if isinstance(columnType, sqltypes.String):
+        return str
+    if isinstance(columnType, sqltypes.Boolean):
+        return bool
+    if isinstance(columnType, sqltypes.Integer):
+        return int
+    if isinstance(columnType, sqltypes.Float):
+        return float
+    if isinstance(columnType, sqltypes.DateTime):
+        return datetime
+    return None
+
+
+class ColumnMetadata:
+    """
+    Column information of a mapped attribute
+    """
+
+    def __init__(self, key: str, column: Column):
+        self.key = key
+        self.column = column
+        self.name = getattr(column, "name", key)
+        self.type = column.type
+        self.pythonType = get_python_type(column.type)
+        self.nullable = getattr(column, "nullable", True)
+        self.primaryKey = getattr(column, "primary_key", False)
+        self.default = getattr(column, "default", None)
+        self.serverDefault = getattr(column, "server_default", None)
+        self.indexed = bool(getattr(column, "index", False) or getattr(column, "unique", False))
+        if self.pythonType == datetime or not getattr(self.default, "is_scalar", False):
+            self.defaultValue = None
+        else:
+            self.defaultValue = self.default.arg
+
+    @property
+    def hasDefault(self) -> bool:
+        return any([
+            self.default is not None,
+            self.serverDefault is not None,
+            self.primaryKey and self.column.autoincrement in [True, "auto"],
+        ])
+
+    @property
+    def annotation(self) -> Optional[Tuple[Any, Any]]:
+        """
+        (type, default) pair of the pydantic field
+        """
+        if self.pythonType is None:
+            return None
+        if self.nullable:
+            return (Optional[self.pythonType], self.defaultValue)
+        return (self.pythonType, self.defaultValue)
+
+
+class ModelMetadata:
+    """
+    Precomputed columns information of a SQLAlchemy mapped class
+    """
+
+    def __init__(self, classModel):
+        mapper = inspect(classModel)
+        self.classModel = classModel
+        self.tablename = getattr(classModel, "__tablename__", None)
+        self.table = mapper.local_table
+        self.columns: Dict[str, ColumnMetadata] = {}
+        keysByColumn = {}
+        for key, column in mapper.columns.items():
+            keysByColumn[column] = key
+            if "_" in [key[0], key[-1]]:
+                continue
+            self.columns[key] = ColumnMetadata(key, column)
+        self.fields: List[str] = list(self.columns)
+        self.fieldSet = frozenset(self.fields)
+        self.primaryKeys: List[str] = [
+            keysByColumn[c] for c in mapper.primary_key if c in keysByColumn
+        ]
+        self.indexes: List[Tuple[str]] = []
+        for index in getattr(self.table, "indexes", []):
+            self.indexes.append(tuple(keysByColumn.get(c, c.name) for c in index.columns))
+        self.indexedFields = frozenset(
+            [k for k, c in self.columns.items() if c.indexed or c.primaryKey]
+            + [i[0] for i in self.indexes]
+        )
+        self.annotations = {
+            k: c.annotation for k, c in self.columns.items() if c.annotation
+        }
+
+    def get_annotation(self) -> dict:
+        return dict(self.annotations)
+
+
+_registry: Dict[Any, ModelMetadata] = {}
+
+
+def get_model_metadata(classModel) -> ModelMetadata:
+    """
+    get the metadata of the mapped class, it is built once per class
+    """
+    metadata = _registry.get(classModel)
+    if metadata is None:
+        metadata = _registry[classModel] = ModelMetadata(classModel)
+    return metadata
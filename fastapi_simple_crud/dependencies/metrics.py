@@ -0,0 +1,184 @@
+import bisect
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+
+from .status import StatusResponse
+
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+requestStart: ContextVar[Optional[float]] = ContextVar("simplecrudRequestStart", default=None)
+"""
+start of the request being handled, set by 'mark_request_start' before the
+endpoint dependencies are resolved
+"""
+
+
+async def mark_request_start():
+    """
+    route dependency resolved first, the time until the CRUD operation starts
+    is its 'dependencies' phase
+    """
+    requestStart.set(time.perf_counter())
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class NullTimer:
+    """
+    timer of the operations when the metrics are disabled, it does nothing
+    """
+
+    async def checkout(self, session):
+        pass
+
+    def lap(self, phase: str):
+        pass
+
+    def rows(self, count: int):
+        pass
+
+    def finish(self, res=None, code: Optional[int] = None):
+        pass
+
+
+nullTimer = NullTimer()
+
+
+class OperationTimer(NullTimer):
+    """
+    Phases of a CRUD operation, 'lap(phase)' adds the time since the previous lap
+    to the phase. 'finish' records the phases, the rows and the status code.
+
+    phases: dependencies, checkout (pool), cache, build (query), count, query,
+    serialize, write, send (export) and total
+    """
+    def __init__(self, metrics: "Metrics", table: str, operation: str):
+        self.metrics = metrics
+        self.labels = (table, operation)
+        self.phases: Dict[str, float] = {}
+        self.rowCount = 0
+        self.start = self.last = time.perf_counter()
+        start = requestStart.get()
+        if start is not None:
+            requestStart.set(None)
+            self.phases["dependencies"] = self.start - start
+
+    async def checkout(self, session):
+        """
+        acquire the connection of the session from the pool
+        """
+        await session.connection()
+        self.lap("checkout")
+
+    def lap(self, phase: str):
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self.last
+        self.last = now
+
+    def rows(self, count: int):
+        self.rowCount += count
+
+    def finish(self, res=None, code: Optional[int] = None):
+        """
+        - res -> response of the operation, its status code is counted
+        (an already encoded response is a success)
+        - code -> status code, when there is no response
+        """
+        if code is None:
+            code = res["status"]["code"] if isinstance(res, dict) else StatusResponse.success
+        self.phases["total"] = time.perf_counter() - self.start
+        self.metrics.record(self.labels, self.phases, self.rowCount, code)
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Metrics:
+    """
+    Counters and phase histograms of the CRUD operations labeled by table and
+    operation, rendered in Prometheus text format
+
+    - simplecrud_operations_total -> operations
+    - simplecrud_responses_total -> operations by status code (StatusResponse)
+    - simplecrud_rows_total -> rows returned by the reads
+    - simplecrud_phase_seconds -> histogram of every phase
+    """
+
+    def __init__(self, prefix: str = "simplecrud", buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(sorted(buckets))
+        self.operations: Dict[Tuple[str, str], int] = {}
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        self.rows: Dict[Tuple[str, str], int] = {}
+        self.phases: Dict[Tuple[str, str, str], Histogram] = {}
+
+    def timer(self, table: str, operation: str) -> OperationTimer:
+        return OperationTimer(self, table, operation)
+
+    def record(self, labels: Tuple[str, str], phases: Dict[str, float], rows: int, code: int):
+        self.operations[labels] = self.operations.get(labels, 0) + 1
+        key = labels + (code,)
+        self.responses[key] = self.responses.get(key, 0) + 1
+        if rows:
+            self.rows[labels] = self.rows.get(labels, 0) + rows
+        for phase, seconds in phases.items():
+            key = labels + (phase,)
+            histogram = self.phases.get(key)
+            if histogram is None:
+                histogram = self.phases[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def clear(self):
+        self.operations.clear()
+        self.responses.clear()
+        self.rows.clear()
+        self.phases.clear()
+
+    def _labels(self, names: Sequence[str], values: Sequence) -> str:
+        return ",".join(f'{n}="{escape_label(v)}"' for n, v in zip(names, values))
+
+    def render(self) -> str:
+        """
+        Prometheus text exposition format (version 0.0.4)
+        """
+        lines = []
+        counters = [
+            ("operations_total", "CRUD operations", ["table", "operation"], self.operations),
+            ("responses_total", "CRUD operations by status code", ["table", "operation", "code"], self.responses),
+            ("rows_total", "rows returned by the reads", ["table", "operation"], self.rows),
+        ]
+        for name, description, labelNames, values in counters:
+            name = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(values.items()):
+                lines.append(f"{name}{{{self._labels(labelNames, labels)}}} {value}")
+        name = f"{self.prefix}_phase_seconds"
+        lines.append(f"# HELP {name} duration of the CRUD operation phases")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in sorted(self.phases.items()):
+            labels = self._labels(["table", "operation", "phase"], labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
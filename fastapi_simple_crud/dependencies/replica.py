@@ -0,0 +1,145 @@
+import inspect
+import math
+import time
+from contextlib import asynccontextmanager, contextmanager
+from types import FunctionType
+from typing import AsyncIterator, Optional, Tuple
+
+from fastapi import Depends, Request, Response
+from fastapi.concurrency import contextmanager_in_threadpool, run_in_threadpool
+
+
+class ReadYourWrites:
+    """
+    Pin a client to the primary for 'window' seconds after a write, by a cookie
+    holding the end of the window, so it reads its own writes while the
+    replicas catch up
+    """
+    cookie = "simplecrud_primary"
+
+    def __init__(self, window: float, cookie: Optional[str] = None):
+        self.window = window
+        if cookie:
+            self.cookie = cookie
+
+    def is_pinned(self, request: Request) -> bool:
+        value = request.cookies.get(self.cookie)
+        try:
+            return value is not None and float(value) > time.time()
+        except ValueError:
+            return False
+
+    def pin(self, response: Response):
+        response.set_cookie(
+            self.cookie,
+            f"{time.time() + self.window:.3f}",
+            max_age=math.ceil(self.window),
+            httponly=True,
+            samesite="lax"
+        )
+
+
+def has_parameters(getter: FunctionType) -> bool:
+    try:
+        return bool(inspect.signature(getter).parameters)
+    except (TypeError, ValueError):
+        return True
+
+
+@asynccontextmanager
+async def enter_session(getter: FunctionType) -> AsyncIterator:
+    """
+    session of a getter without parameters, entered as FastAPI would enter the dependency
+    (async/sync generator or async/sync function)
+    """
+    if inspect.isasyncgenfunction(getter):
+        async with asynccontextmanager(getter)() as session:
+            yield session
+    elif inspect.isgeneratorfunction(getter):
+        async with contextmanager_in_threadpool(contextmanager(getter)()) as session:
+            yield session
+    elif inspect.iscoroutinefunction(getter):
+        yield await getter()
+    else:
+        yield await run_in_threadpool(getter)
+
+
+def route_sessions(
+        sessionGetter: FunctionType,
+        readSessionGetter: Optional[FunctionType] = None,
+        readYourWrites: Optional[ReadYourWrites] = None
+    ) -> Tuple[FunctionType, FunctionType]:
+    """
+    session dependencies of the reads and of the writes
+
+    - sessionGetter -> session getter of the primary
+    - readSessionGetter -> session getter of the replicas, the primary when None
+    - readYourWrites -> the reads of a client are routed to the primary after its writes
+
+    the write dependency pins the client on its response, the response returned
+    by the endpoint is pinned by 'request.state.simplecrudPrimaryPin'
+
+    the read dependency opens the session of the chosen getter only (the
+    'dependency_overrides' of the application apply), unless a getter has
+    parameters of its own: both are then solved by FastAPI
+    """
+    if readSessionGetter is None or readSessionGetter is sessionGetter:
+        return sessionGetter, sessionGetter
+    if readYourWrites is None:
+        return readSessionGetter, sessionGetter
+
+    if has_parameters(sessionGetter) or has_parameters(readSessionGetter):
+        async def read_session(
+                request: Request,
+                readSession=Depends(readSessionGetter),
+                writeSession=Depends(sessionGetter)
+            ):
+            return writeSession if readYourWrites.is_pinned(request) else readSession
+    else:
+        async def read_session(request: Request):
+            getter = sessionGetter if readYourWrites.is_pinned(request) else readSessionGetter
+            overrides = getattr(request.app, "dependency_overrides", None) or {}
+            async with enter_session(overrides.get(getter, getter)) as session:
+                yield session
+
+    async def write_session(request: Request, response: Response, session=Depends(sessionGetter)):
+        readYourWrites.pin(response)
+        request.state.simplecrudPrimaryPin = readYourWrites
+        return session
+
+    return read_session, write_session
+
+
+def route_session_opener(
+        sessionGetter: FunctionType,
+        readSessionGetter: Optional[FunctionType] = None,
+        readYourWrites: Optional[ReadYourWrites] = None
+    ) -> FunctionType:
+    """
+    dependency returning an opener of the read session, the session is opened
+    when the opener is entered (ex: in a streamed body, which is sent after the
+    dependencies with yield are closed)
+
+    a getter with parameters of its own is solved by FastAPI, its session is the
+    one the opener enters
+    """
+    if readSessionGetter is None:
+        readSessionGetter = sessionGetter
+    if has_parameters(sessionGetter) or has_parameters(readSessionGetter):
+        readSession, _ = route_sessions(sessionGetter, readSessionGetter, readYourWrites)
+
+        async def injected_opener(session=Depends(readSession)):
+            @asynccontextmanager
+            async def open_session():
+                yield session
+            return open_session
+        return injected_opener
+
+    async def opener(request: Request):
+        getter = readSessionGetter
+        if readYourWrites is not None and readYourWrites.is_pinned(request):
+            getter = sessionGetter
+        overrides = getattr(request.app, "dependency_overrides", None) or {}
+        getter = overrides.get(getter, getter)
+        return lambda: enter_session(getter)
+    return opener
@@ -0,0 +1,120 @@
+import enum
+import hashlib
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_default(obj):
+    """
+    'default' of json.dumps for the column values that are not JSON native
+    """
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def encode_json(content) -> bytes:
+    """
+    encode the response content as the JSONResponse does,
+    with orjson when it is installed
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content,
+        default=json_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response which encodes datetime, date, enum, Decimal and UUID values
+    by itself, the content does not need 'jsonable_encoder'
+    """
+
+    def render(self, content) -> bytes:
+        return encode_json(content)
+
+
+def encoded_response(body: bytes) -> Response:
+    """
+    response of an already encoded JSON body
+    """
+    return Response(content=body, media_type="application/json")
+
+
+def make_etag(body: bytes) -> str:
+    """
+    strong validator of the response body
+    """
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(ifNoneMatch: Optional[str], etag: str) -> bool:
+    """
+    whether the 'If-None-Match' header matches the etag (weak comparison)
+    """
+    if not ifNoneMatch:
+        return False
+    for tag in ifNoneMatch.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.replace("W/", "", 1) == etag:
+            return True
+    return False
+
+
+def conditional_response(
+        request: Request,
+        content,
+        etag: bool = True,
+        cache_control: Optional[str] = None
+    ) -> Response:
+    """
+    encode the response (a response envelope or an encoded Response) with its
+    'ETag' and 'Cache-Control' headers, answer '304 Not Modified' when the
+    request 'If-None-Match' matches
+    """
+    if isinstance(content, Response):
+        body = content.body
+    else:
+        body = encode_json(content)
+    headers = {}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    if etag:
+        headers["ETag"] = make_etag(body)
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+    response = encoded_response(body)
+    response.headers.update(headers)
+    return response
+
+
+def fast_response(res) -> Response:
+    """
+    FastJSONResponse of a CRUD result, an already built Response is left as is
+    """
+    if isinstance(res, Response):
+        return res
+    return FastJSONResponse(res)
@@ -0,0 +1,164 @@
+import enum
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from pydantic import BaseModel, create_model
+from sqlalchemy.sql import sqltypes
+from sqlalchemy.types import TypeDecorator
+
+from .metadata import get_model_metadata
+
+
+def _enum_value(value):
+    return value.value if isinstance(value, enum.Enum) else value
+
+def _decimal_float(value):
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def get_converter(columnType) -> Optional[Callable[[Any], Any]]:
+    """
+    converter of the column values that are not encoded natively to JSON,
+    datetime values are left to the response encoder
+    """
+    while isinstance(columnType, TypeDecorator):
+        columnType = columnType.impl
+    if isinstance(columnType, sqltypes.Enum) and columnType.enum_class:
+        return _enum_value
+    if isinstance(columnType, sqltypes.Numeric) and columnType.asdecimal:
+        return _decimal_float
+    return None
+
+
+class RowSerializer:
+    """
+    Row (tuple of the selected columns) to dict serializers of a mapped class.
+
+    A serializer is compiled once per selection of fields into a single dict
+    literal, only the columns needing a conversion call their converter.
+    The 'maxsize' most recently used serializers are kept.
+    """
+    maxsize = 256
+
+    def __init__(self, classModel):
+        self.metadata = get_model_metadata(classModel)
+        self.converters = {}
+        for key, column in self.metadata.columns.items():
+            converter = get_converter(column.type)
+            if converter:
+                self.converters[key] = converter
+        self._compiled = OrderedDict()
+
+    def compile(self, fields: Sequence[str]) -> Callable[[Sequence], dict]:
+        fields = tuple(fields)
+        serialize = self._compiled.get(fields)
+        if serialize is None:
+            serialize = self._compiled[fields] = self._build(fields)
+            while len(self._compiled) > self.maxsize:
+                self._compiled.popitem(last=False)
+        else:
+            self._compiled.move_to_end(fields)
+        return serialize
+
+    def _build(self, fields: tuple) -> Callable[[Sequence], dict]:
+        namespace = {}
+        items = []
+        for i, key in enumerate(fields):
+            value = f"row[{i}]"
+            if key in self.converters:
+                namespace[f"_c{i}"] = self.converters[key]
+                value = f"_c{i}({value})"
+            items.append(f"{key!r}: {value}")
+        source = "def serialize(row):\n    return {" + ", ".join(items) + "}\n"
+        exec(source, namespace)
+        return namespace["serialize"]
+
+    def serialize(self, fields: Sequence[str], rows: Sequence[Sequence]) -> List[dict]:
+        serialize = self.compile(fields)
+        return [serialize(r) for r in rows]
+
+
+_serializers: Dict[Any, RowSerializer] = {}
+
+
+def get_row_serializer(classModel) -> RowSerializer:
+    """
+    get the row serializer of the mapped class, it is built once per class
+    """
+    serializer = _serializers.get(classModel)
+    if serializer is None:
+        serializer = _serializers[classModel] = RowSerializer(classModel)
+    return serializer
+
+
+class ResponseStatus(BaseModel):
+    code: int
+    message: str
+
+
+class ResponsePageMeta(BaseModel):
+    page: Optional[int]
+    length: int
+    total: Optional[int]
+    next_cursor: Optional[str]
+
+
+class ResponseModels:
+    """
+    Pydantic models of the response envelopes of a mapped class, they are used
+    to document the responses only (the responses are not validated)
+
+    - row -> a row, every field is optional as the fields can be selected
+    - one -> envelope of a single row
+    - many -> envelope of a page of rows
+    - batch -> envelope of the rows read by ids, with the missing ids
+    """
+
+    def __init__(self, classModel, modelName: str = ""):
+        metadata = get_model_metadata(classModel)
+        if not modelName:
+            modelName = metadata.tablename
+        self.row = create_model(
+            modelName+"PydanticRow",
+            **{
+                k: (Optional[c.pythonType] if c.pythonType else Any, None)
+                for k, c in metadata.columns.items()
+            }
+        )
+        self.one = create_model(
+            modelName+"PydanticResponseOne",
+            data=(Optional[self.row], None),
+            meta=(dict, {}),
+            status=(ResponseStatus, ...)
+        )
+        rowList = create_model(modelName+"PydanticRowList", list=(List[self.row], []))
+        self.many = create_model(
+            modelName+"PydanticResponseMany",
+            data=(rowList, ...),
+            meta=(ResponsePageMeta, ...),
+            status=(ResponseStatus, ...)
+        )
+        rowBatch = create_model(
+            modelName+"PydanticRowBatch",
+            list=(List[self.row], []),
+            missing=(List[Any], [])
+        )
+        self.batch = create_model(
+            modelName+"PydanticResponseBatch",
+            data=(Optional[rowBatch], None),
+            meta=(dict, {}),
+            status=(ResponseStatus, ...)
+        )
+
+
+_responseModels: Dict[Any, ResponseModels] = {}
+
+
+def get_response_models(classModel) -> ResponseModels:
+    """
+    get the response models of the mapped class, they are built once per class
+    """
+    models = _responseModels.get(classModel)
+    if models is None:
+        models = _responseModels[classModel] = ResponseModels(classModel)
+    return models
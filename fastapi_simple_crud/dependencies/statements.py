@@ -0,0 +1,207 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Set
+
+from sqlalchemy import event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .log import logger
+
+
+class SQLBudgetExceeded(Exception):
+    """
+    raised when a request executes more statements than its budget
+    """
+
+
+class StatementCounter:
+    """
+    statements executed (an executemany is one statement) and their time
+    """
+
+    def __init__(self, budget: Optional[int] = None, record: bool = False):
+        self.count = 0
+        self.seconds = 0.0
+        self.budget = budget
+        self.record = record
+        self.statements: List[str] = []
+
+    def add(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        if self.record:
+            self.statements.append(statement)
+
+    @property
+    def exceeded(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+
+currentCounter: ContextVar[Optional[StatementCounter]] = ContextVar(
+    "simplecrudStatementCounter", default=None
+)
+"""
+counter of the request being handled, the SQLAlchemy greenlets run in the
+context of the task awaiting them so the engine events see it
+"""
+
+_collectors: Set[StatementCounter] = set()
+"""
+counters of 'count_statements', they see the statements of every task and thread
+"""
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._simplecrudStatementStart = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - context._simplecrudStatementStart
+    counter = currentCounter.get()
+    if counter is not None:
+        counter.add(statement, seconds)
+    for collector in _collectors:
+        if collector is not counter:
+            collector.add(statement, seconds)
+
+
+def instrument_engine(engine):
+    """
+    count the statements of the engine (AsyncEngine or Engine), it is done once per engine
+    """
+    engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+
+def set_statement_budget(budget: Optional[int]):
+    """
+    budget of the request being handled, it replaces the default budget of the middleware
+    """
+    counter = currentCounter.get()
+    if counter is not None and budget is not None:
+        counter.budget = budget
+
+
+def statement_budget(budget: int):
+    """
+    dependency setting the budget of the request before the endpoint executes its statements
+    """
+    async def set_budget():
+        set_statement_budget(budget)
+    return set_budget
+
+
+class SQLCountMiddleware:
+    """
+    Count the statements and their time per request, in the 'X-SQL-Count'
+    and 'X-SQL-Time' (milliseconds) response headers
+
+    - engine -> engine to instrument (or call 'instrument_engine' yourself)
+    - budget -> default maximum statements of a request, 'SimpleEndpoint(sql_budget=...)'
+    replaces it for an endpoint
+    - raise_on_exceed -> raise SQLBudgetExceeded (500) instead of logging a warning
+    - headers -> add the response headers
+
+    the statements of a streaming response body are not counted by the headers,
+    the budget of the whole response is checked again (and logged) once it is sent
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            engine=None,
+            budget: Optional[int] = None,
+            raise_on_exceed: bool = False,
+            headers: bool = True
+        ):
+        self.app = app
+        self.budget = budget
+        self.raiseOnExceed = raise_on_exceed
+        self.headers = headers
+        if engine is not None:
+            instrument_engine(engine)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        counter = StatementCounter(self.budget)
+        token = currentCounter.set(counter)
+        exceededAtStart = False
+
+        async def send_counted(message: Message):
+            nonlocal exceededAtStart
+            if message["type"] == "http.response.start":
+                exceededAtStart = counter.exceeded
+                self.check_budget(scope, counter)
+                if self.headers:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-sql-count", str(counter.count).encode()))
+                    headers.append((b"x-sql-time", f"{counter.seconds * 1000:.3f}".encode()))
+                    message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                if not exceededAtStart and counter.exceeded:
+                    logger.warning(self.budget_message(scope, counter))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_counted)
+        finally:
+            currentCounter.reset(token)
+
+    def check_budget(self, scope: Scope, counter: StatementCounter):
+        if not counter.exceeded:
+            return
+        message = self.budget_message(scope, counter)
+        if self.raiseOnExceed:
+            raise SQLBudgetExceeded(message)
+        logger.warning(message)
+
+    def budget_message(self, scope: Scope, counter: StatementCounter) -> str:
+        return (
+            f"{scope['method']} {scope['path']} executed {counter.count} SQL statements,"
+            f" its budget is {counter.budget}"
+        )
+
+
+@contextmanager
+def count_statements(engine=None) -> Iterator[StatementCounter]:
+    """
+    count the statements executed inside the block, in any task or thread
+    (ex: through a TestClient)
+
+        with count_statements(engine) as counter:
+            client.get("/people")
+        assert counter.count == 2
+    """
+    if engine is not None:
+        instrument_engine(engine)
+    counter = StatementCounter(record=True)
+    _collectors.add(counter)
+    try:
+        yield counter
+    finally:
+        _collectors.discard(counter)
+
+
+@contextmanager
+def assert_statements(count: int, engine=None, exact: bool = True) -> Iterator[StatementCounter]:
+    """
+    assert the statements executed inside the block, exactly 'count' or at most
+    'count' when 'exact' is False
+
+        with assert_statements(1, engine):
+            client.delete("/people", params={"name": "x"})
+    """
+    with count_statements(engine) as counter:
+        yield counter
+    if (counter.count != count) if exact else (counter.count > count):
+        statements = "\n".join(f"  {s}" for s in counter.statements)
+        expected = count if exact else f"at most {count}"
+        raise AssertionError(
+            f"{counter.count} SQL statements executed, expected {expected}:\n{statements}"
+        )
@@ -1,12 +1,40 @@
+import inspect
 from typing import Optional
 from fastapi import Query, Depends
+from pydantic import conint
+
+
+PageNumber = conint(ge=1)
+PageLimit = conint(gt=0, le=100)
+"""
+constraints declared once, a constraint given to Query() creates a new type
+for every route which slows down the routes registration
+"""
+
+
+def query_parameters(**queries):
+    """
+    describe the parameters of a dependency class by Query objects on its signature
+    only, its __init__ keeps plain defaults so it can be constructed directly
+
+    the parameters without a Query of their own get a Query of their default
+    """
+    def decorator(cls):
+        signature = inspect.signature(cls.__init__)
+        parameters = [
+            p.replace(default=queries.get(p.name, Query(default=p.default)))
+            for p in list(signature.parameters.values())[1:]
+        ]
+        cls.__signature__ = signature.replace(parameters=parameters)
+        return cls
+    return decorator
 
 
 class CommonQueryPagination:
     def __init__(
         self,
-        page: int = Query(default=1, ge=1),
-        limit: int = Query(default=20, gt=0, le=100),
+        page: PageNumber = Query(default=1),
+        limit: PageLimit = Query(default=20),
     ):
 
         self.page = page
@@ -26,17 +54,55 @@ class CommonQueryFilter:
         self.sortType = sortType
 
 
+@query_parameters(
+    cursor=Query(
+        default=None,
+        description="Opaque 'next_cursor' from a previous page, replaces 'page' when given",
+    ),
+    countStrategy=Query(
+        default=None,
+        description="How 'meta.total' is counted: exact, none, estimated, cached or window",
+    ),
+)
 class CommonQueryGetter:
+    def __init__(
+        self,
+        fields: Optional[str] = None,
+        page: PageNumber = 1,
+        limit: PageLimit = 20,
+        sortBy: str = "id",
+        sortType: str = "asc",
+        cursor: Optional[str] = None,
+        countStrategy: Optional[str] = None,
+    ):
+        self.fields = fields
+        self.page = page
+        self.limit = limit
+        self.sortBy = sortBy
+        self.sortType = sortType
+        self.cursor = cursor
+        self.countStrategy = countStrategy
+
+
+class CommonQueryExport:
     def __init__(
         self,
         fields: Optional[str] = Query(default=None),
-        page: int = Query(default=1, ge=1),
-        limit: int = Query(default=20, gt=0, le=100),
         sortBy: str = Query(default="id"),
         sortType: str = Query(default="asc"),
+        format: str = Query(default="ndjson", description="ndjson or csv"),
     ):
         self.fields = fields
-        self.page = page
-        self.limit = limit
         self.sortBy = sortBy
         self.sortType = sortType
+        self.format = format
+
+
+class CommonQueryBatch:
+    def __init__(
+        self,
+        ids: str = Query(..., description="Comma separated primary key values, ex: 1,2,3"),
+        fields: Optional[str] = Query(default=None),
+    ):
+        self.ids = ids
+        self.fields = fields
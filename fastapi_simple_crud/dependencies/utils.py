@@ -1,16 +1,33 @@
 import fastapi
-from datetime import datetime
+import base64
+import csv
+import enum
+import inspect
+import io
+import json
+from datetime import datetime, date, time
+from decimal import Decimal
+from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import load_only, decl_api
 from sqlalchemy.orm.attributes import InstrumentedAttribute
-from sqlalchemy import asc, desc, func, Column
+from sqlalchemy import asc, desc, insert, update, delete, bindparam, tuple_, Column
+from sqlalchemy import and_
 from sqlalchemy.sql.selectable import Select
-from typing import Any, List, Optional, Union, Dict
+from sqlalchemy.sql.dml import Insert
+from typing import Any, AsyncIterator, List, Optional, Union, Dict
 from pydantic import create_model
 
 from .status import StatusResponse
-from .utility import CommonQueryGetter
+from .utility import CommonQueryGetter, CommonQueryExport
+from .count import CountStrategy, CountCache, count_query, countCache, window_count_column
+from .metadata import get_model_metadata
+from .serializer import get_row_serializer
+from .cache import CacheBackend, ResultCache, normalize_params
+from .response import json_default, encode_json
+from .metrics import Metrics, nullTimer
+from .coalesce import ReadOneCoalescer, SingleFlight, dedicated_session, session_configuration
 from .log import logger
 
 
@@ -27,9 +44,23 @@ def create_response(data={}, meta={}, status={}):
         "status": status,
     }
 
+sortedReturning = "sort_by_parameter_order" in inspect.signature(Insert.returning).parameters
+"""
+whether the RETURNING rows of an executemany INSERT can follow the parameters order (SQLAlchemy 2.0)
+"""
+
+def support_returning(dialect, statementType: str) -> bool:
+    """
+    whether the dialect supports RETURNING for 'insert', 'update' or 'delete' statements
+    """
+    supported = getattr(dialect, statementType+"_returning", None)
+    if supported is None:
+        supported = getattr(dialect, "full_returning", False)
+    return bool(supported)
+
 async def update_data(session, tableModel, dataObject, newDataPydantic):
     updates = {}
-    fields = [i for i in vars(tableModel) if "_" not in [i[0], i[-1]]]
+    fields = get_model_metadata(tableModel).fields
     for key in fields:
         if key in newDataPydantic.__dict__:
             updates[key] = newDataPydantic.__dict__[key]
@@ -39,6 +70,15 @@ async def update_data(session, tableModel, dataObject, newDataPydantic):
     await session.commit()
     await session.refresh(dataObject)
 
+def bind_name(session) -> Optional[str]:
+    """
+    URL (without password) of the database the session is bound to
+    """
+    url = getattr(getattr(session, "bind", None), "url", None)
+    if url is None:
+        return None
+    return url.render_as_string(hide_password=True)
+
 class StatusCreator(StatusResponse):
     """
     to add more status, edit dependencies/status.py in StatusResponse class
@@ -69,16 +109,7 @@ status = StatusCreator()
 
 def get_field(classModel):
     try:
-        fields = [i for i in vars(classModel) if "_" not in [i[0], i[-1]]]
-        columnFields = []
-        for f in fields:
-            if "comparator" in classModel.__dict__[f].__dict__:
-                if (
-                    "column"
-                    in str(classModel.__dict__[f].__dict__["comparator"]).lower()
-                ):
-                    columnFields.append(f)
-        return columnFields
+        return list(get_model_metadata(classModel).fields)
     except:
         return []
 
@@ -89,6 +120,177 @@ def validate_field(modelField, targetField):
         availableField = get_field(modelField)
     return [i for i in targetField if i in availableField]
 
+def _encode_cursor_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, time):
+        return {"t": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    if isinstance(value, UUID):
+        return {"uuid": str(value)}
+    if isinstance(value, bytes):
+        return {"b": base64.b64encode(value).decode()}
+    if isinstance(value, enum.Enum):
+        return value.name
+    return value
+
+def _decode_cursor_value(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "t" in value:
+            return time.fromisoformat(value["t"])
+        if "dec" in value:
+            return Decimal(value["dec"])
+        if "uuid" in value:
+            return UUID(value["uuid"])
+        if "b" in value:
+            return base64.b64decode(value["b"])
+    return value
+
+def encode_cursor(sortBy: str, sortType: str, values: list) -> str:
+    """
+    encode the keyset values of the last row into an opaque cursor
+    """
+    payload = [sortBy, sortType, [_encode_cursor_value(v) for v in values]]
+    payload = json.dumps(payload, default=json_default, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sortBy: str, sortType: str) -> list:
+    """
+    decode a cursor made by 'encode_cursor', it has to be used with the same sorting
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursorSortBy, cursorSortType, values = json.loads(payload)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if [cursorSortBy, cursorSortType] != [sortBy, sortType]:
+        raise ValueError("Cursor does not match the sortBy/sortType parameters")
+    return [_decode_cursor_value(v) for v in values]
+
+NullsOrderingDialects = {"postgresql", "oracle", "sqlite"}
+"""
+dialects supporting NULLS FIRST/LAST
+"""
+
+def session_dialect(session):
+    bind = getattr(session, "bind", None)
+    if bind is None:
+        bind = session.get_bind()
+    return bind.dialect
+
+def nulls_greatest(dialect) -> bool:
+    """
+    whether NULL is ordered as the greatest value of a nullable keyset column,
+    the other dialects (ex: MySQL, SQL Server) order it natively as the lowest one
+    """
+    return dialect is not None and dialect.name in NullsOrderingDialects
+
+def order_keyset(
+        columns: list,
+        sortType: str,
+        nullable: Optional[list] = None,
+        dialect=None
+    ) -> list:
+    """
+    ORDER BY clauses of the keyset, the columns are ordered as they are
+    (with NULLS FIRST/LAST when it is supported) so their index serves the ordering
+    """
+    orderMethod = desc if sortType == "desc" else asc
+    if not nullable:
+        nullable = [False] * len(columns)
+    clauses = []
+    for column, isNullable in zip(columns, nullable):
+        clause = orderMethod(column)
+        if isNullable and nulls_greatest(dialect):
+            clause = clause.nulls_first() if sortType == "desc" else clause.nulls_last()
+        clauses.append(clause)
+    return clauses
+
+def _compare(columns: list, values: list, sortType: str):
+    if len(columns) == 1:
+        left, right = columns[0], values[0]
+    else:
+        left, right = tuple_(*columns), tuple_(*values)
+    return left < right if sortType == "desc" else left > right
+
+def seek_conditions(
+        columns: list,
+        values: list,
+        sortType: str,
+        nullable: Optional[list] = None,
+        dialect=None
+    ) -> list:
+    """
+    conditions of the rows right after the row holding the given values, to be
+    queried in this order. Every condition is a row value comparison or an
+    IS (NOT) NULL an index can serve: when the first column can be NULL, the rows
+    of its NULL values are a condition of their own instead of an OR
+    """
+    if not columns or len(columns) != len(values):
+        raise ValueError("Invalid cursor")
+    if not nullable or not nullable[0]:
+        if None in values:
+            raise ValueError("Invalid cursor")
+        return [_compare(columns, values, sortType)]
+    if len(columns) == 1 or None in values[1:]:
+        raise ValueError("Invalid cursor")
+    first, value = columns[0], values[0]
+    nullsFirst = (sortType == "desc") == nulls_greatest(dialect)
+    if value is None:
+        conditions = [and_(first.is_(None), _compare(columns[1:], values[1:], sortType))]
+        if nullsFirst:
+            conditions.append(first.is_not(None))
+        return conditions
+    conditions = [_compare(columns, values, sortType)]
+    if not nullsFirst:
+        conditions.append(first.is_(None))
+    return conditions
+
+
+class ExportFormat:
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+ExportMediaTypes = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def encode_ndjson(fields: list, rows: list) -> bytes:
+    return "".join([
+        json.dumps(dict(zip(fields, r)), default=json_default, separators=(",", ":")) + "\n"
+        for r in rows
+    ]).encode()
+
+def csv_value(value):
+    """
+    CSV cell of a column value, written as it is in the JSON exports
+    """
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    try:
+        return json_default(value)
+    except TypeError:
+        return value
+
+def encode_csv(fields: list, rows: list, header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(fields)
+    writer.writerows([[csv_value(v) for v in r] for r in rows])
+    return buffer.getvalue().encode()
+
+
 class SimpleCRUDBaseDeclaration:
     base = None
     
@@ -163,10 +365,11 @@ class Selector:
 class QueryManager:
     def __init__(self, classModel):
         self.classModel = classModel
+        self.metadata = get_model_metadata(classModel)
 
     @property
     def fields(self) -> list:
-        return get_field(self.classModel)
+        return self.metadata.fields
 
     @property
     def rawQuery(self) -> Select:
@@ -174,36 +377,121 @@ class QueryManager:
 
     def validate_fields(self, fields: list) -> list:
         if fields:
-            return [i for i in fields if i in self.fields]
+            return [i for i in fields if i in self.metadata.fieldSet]
         return []
 
+    def projection(self, fields: Optional[str] = None) -> list:
+        """
+        validated fields (comma separated) to be selected, the unknown fields are
+        ignored and all fields are selected when none of them is valid
+        """
+        if fields:
+            validFields = self.validate_fields(fields.split(","))
+            if validFields:
+                return validFields
+        return self.fields
+
+    def project(self, query: Select, fields: list) -> Select:
+        """
+        select only the columns of the fields, rows are fetched as plain tuples
+        without building the ORM instances
+        """
+        return query.with_only_columns(*[self.classModel.__dict__[k] for k in fields])
+
 
 def QueryPaginator(
-    getParams: CommonQueryGetter, _obj: Union[decl_api.DeclarativeMeta, Selector]
+    getParams: CommonQueryGetter,
+    _obj: Union[decl_api.DeclarativeMeta, Selector],
+    countStrategy: str = CountStrategy.exact,
+    countCache: Optional[CountCache] = None
 ):
     """
     Query Paginator generator for single or multiple table
     """
     if type(_obj) == Selector:
-        return QueryPaginatorMultiple(getParams, _obj)
+        return QueryPaginatorMultiple(getParams, _obj, countStrategy, countCache)
     if _obj.__class__ == decl_api.DeclarativeMeta:
         if len(_obj.__mro__) == 3:
-            return QueryPaginatorSingle(getParams, _obj)
+            return QueryPaginatorSingle(getParams, _obj, countStrategy, countCache)
     raise BaseException("Error Paginator")
 
 
-class QueryPaginatorSingle(QueryManager):
+class QueryCounter:
+    """
+    count the total of a paginated query by using the requested or the default strategy
+    """
+    countStrategy = CountStrategy.exact
+    countCache = None
+    timer = nullTimer
+
+    @property
+    def tables(self) -> list:
+        return []
+
+    def get_count_strategy(self) -> str:
+        return getattr(self.getParams, "countStrategy", None) or self.countStrategy
+
+    async def count(
+            self,
+            session: AsyncSession,
+            query: Select,
+            strategy: Optional[str] = None
+        ) -> Optional[int]:
+        if not strategy:
+            strategy = self.get_count_strategy()
+        return await count_query(session, query, strategy, self.tables, self.countCache)
+
+    def use_cursor(self) -> bool:
+        """
+        cursor pagination is requested by a 'cursor' parameter, empty for the first page
+        """
+        return getattr(self.getParams, "cursor", None) is not None
+
+    def use_window_count(self) -> bool:
+        """
+        the total is fetched with the page by 'count(*) OVER ()',
+        a cursor page only sees the rows after the cursor so it is counted separately
+        """
+        cursor = getattr(self.getParams, "cursor", None)
+        return self.get_count_strategy() == CountStrategy.window and not cursor
+
+    async def execute_seek(self, queries: List[Select], limit: int, execute) -> list:
+        """
+        rows of the seek queries, queried in their order until 'limit' rows are fetched
+        """
+        rows = []
+        for query in queries:
+            rows += await execute(query.limit(limit - len(rows)))
+            if len(rows) >= limit:
+                break
+        return rows
+
+    async def count_empty_page(self, session: AsyncSession, query: Select) -> int:
+        """
+        total of the window count strategy when the page has no row to carry it
+        """
+        if self.getParams.page == 1:
+            return 0
+        return await self.count(session, query, CountStrategy.exact)
+
+
+class QueryPaginatorSingle(QueryManager, QueryCounter):
     """
     Query Paginator for common use of paginating functions
     """
 
-    def __init__(self, getParams: CommonQueryGetter, classModel):
+    def __init__(
+            self,
+            getParams: CommonQueryGetter,
+            classModel,
+            countStrategy: str = CountStrategy.exact,
+            countCache: Optional[CountCache] = None
+        ):
         QueryManager.__init__(self, classModel)
         self.getParams = getParams
-        if getParams.fields:
-            self.filterFields = self.validate_fields(getParams.fields.split(","))
-        else:
-            self.filterFields = self.fields
+        self.countStrategy = countStrategy
+        self.countCache = countCache
+        self.filterFields = self.projection(getParams.fields)
 
     def filter(self, query: Select, fields: Optional[list] = None) -> Select:
         """
@@ -230,7 +518,7 @@ class QueryPaginatorSingle(QueryManager):
         """
         sort your query by defining both the sortBy 'fields' and sortType 'asc'/'desc' parameters
         """
-        if sortBy in self.fields:
+        if sortBy in self.metadata.fieldSet:
             merchantOrder = self.classModel.__dict__[sortBy]
             for iSortType, orderMethod in [["asc", asc], ["desc", desc]]:
                 if sortType == iSortType:
@@ -245,42 +533,125 @@ class QueryPaginatorSingle(QueryManager):
         query = query.limit(limitPerPage)
         return query
 
+    @property
+    def tables(self) -> list:
+        return [self.classModel.__tablename__]
+
+    def keyset(self, sortBy: str) -> list:
+        """
+        unique ordering keys of the query, the sortBy field followed by the primary key
+        """
+        keys = [sortBy] if sortBy in self.metadata.fieldSet else []
+        return keys + [k for k in self.metadata.primaryKeys if k not in keys]
+
+    def keyset_nullable(self, sortBy: str) -> list:
+        return [
+            self.metadata.columns[k].nullable and not self.metadata.columns[k].primaryKey
+            for k in self.keyset(sortBy)
+        ]
+
+    def sort_keyset(self, query: Select, sortBy: str, sortType: str, dialect=None) -> Select:
+        """
+        sort your query by the keyset so every row has a stable position
+        """
+        columns = [self.classModel.__dict__[k] for k in self.keyset(sortBy)]
+        return query.order_by(
+            *order_keyset(columns, sortType, self.keyset_nullable(sortBy), dialect)
+        )
+
+    def seek(self, query: Select, cursor: str, sortBy: str, sortType: str, dialect=None) -> List[Select]:
+        """
+        queries of the rows right after the row the cursor refers to, in their order
+        """
+        values = decode_cursor(cursor, sortBy, sortType)
+        columns = [self.classModel.__dict__[k] for k in self.keyset(sortBy)]
+        conditions = seek_conditions(
+            columns, values, sortType, self.keyset_nullable(sortBy), dialect
+        )
+        return [query.where(c) for c in conditions]
+
     async def execute_pagination(self, session: AsyncSession, query: Select) -> dict:
         """
         sort, filter and paginate the query with executed query outputs
+
+        the page is defined by 'cursor' when it is given, otherwise by 'page'
         """
-        query = self.filter(query)
-        countAfterFilter = await session.execute(
-            select(func.count()).select_from(query.subquery())
-        )
-        countAfterFilter = countAfterFilter.scalars().one()
-        query = self.sort(query, self.getParams.sortBy, self.getParams.sortType)
-        query = self.paginate(query, self.getParams.page, self.getParams.limit)
-        query = await session.execute(query)
-        datas = query.scalars().all()
-        datas = self.filter_primary_key(datas)
+        sortBy, sortType = self.getParams.sortBy, self.getParams.sortType
+        cursor = getattr(self.getParams, "cursor", None)
+        cursorMode = self.use_cursor()
+        keyset = self.keyset(sortBy)
+        columns = self.filterFields + [k for k in keyset if k not in self.filterFields]
+        query = self.project(query, columns)
+        filteredQuery = query
+        windowCount = self.use_window_count()
+        if not windowCount:
+            self.timer.lap("build")
+            countAfterFilter = await self.count(session, query)
+            self.timer.lap("count")
+        dialect = session_dialect(session)
+        query = self.sort_keyset(query, sortBy, sortType, dialect)
+
+        async def execute(query: Select) -> list:
+            return (await session.execute(query)).all()
+
+        if cursor:
+            queries = self.seek(query, cursor, sortBy, sortType, dialect)
+            self.timer.lap("build")
+            rows = await self.execute_seek(queries, self.getParams.limit + 1, execute)
+        else:
+            query = self.paginate(query, self.getParams.page, self.getParams.limit)
+            if cursorMode:
+                query = query.limit(self.getParams.limit + 1)
+            if windowCount:
+                query = query.add_columns(window_count_column())
+            self.timer.lap("build")
+            rows = await execute(query)
+        self.timer.lap("query")
+        if windowCount:
+            if rows:
+                countAfterFilter = rows[0][-1]
+            else:
+                countAfterFilter = await self.count_empty_page(session, filteredQuery)
+                self.timer.lap("count")
+        nextCursor = None
+        if cursorMode and len(rows) > self.getParams.limit:
+            rows = rows[:self.getParams.limit]
+            nextCursor = encode_cursor(
+                sortBy, sortType, [rows[-1][columns.index(k)] for k in keyset]
+            )
+        datas = get_row_serializer(self.classModel).serialize(self.filterFields, rows)
+        self.timer.rows(len(datas))
+        self.timer.lap("serialize")
         return create_response(
             data={"list": datas},
             meta={
-                "page": self.getParams.page,
+                "page": None if cursorMode else self.getParams.page,
                 "length": self.getParams.limit,
                 "total": countAfterFilter,
+                "next_cursor": nextCursor,
             },
             status=status.success(),
         )
 
 
-class QueryPaginatorMultiple:
-    def __init__(self, getParams: CommonQueryGetter, selector: Selector):
+class QueryPaginatorMultiple(QueryCounter):
+    def __init__(
+            self,
+            getParams: CommonQueryGetter,
+            selector: Selector,
+            countStrategy: str = CountStrategy.exact,
+            countCache: Optional[CountCache] = None
+        ):
         self.rawQuery = selector.query
         self.getParams = getParams
         self.selector = selector
+        self.countStrategy = countStrategy
+        self.countCache = countCache
+        self.fields = self.selector.keys
         if getParams.fields:
             self.fields = validate_field(
                 self.selector.keys, getParams.fields.split(",")
-            )
-        else:
-            self.fields = self.selector.keys
+            ) or self.selector.keys
 
     def filter(self, data: list, fields: Optional[list] = None) -> Select:
         """
@@ -316,21 +687,121 @@ class QueryPaginatorMultiple:
         query = query.limit(limitPerPage)
         return query
 
-    async def execute_pagination(self, session: AsyncSession, query: Select):
-        countAfterFilter = await session.execute(
-            select(func.count()).select_from(query.subquery())
+    @property
+    def tables(self) -> list:
+        tables = []
+        for column in self.selector.columns:
+            table = getattr(getattr(column, "expression", column), "table", None)
+            name = getattr(table, "name", None)
+            if name and name not in tables:
+                tables.append(name)
+        return tables
+
+    def primary_keys(self) -> list:
+        """
+        keys of the selected primary key columns
+        """
+        keys = []
+        for k, column in self.selector.columnsKeyPair.items():
+            column = getattr(column, "expression", column)
+            if getattr(column, "primary_key", False):
+                keys.append(k)
+        return keys
+
+    def keyset(self, sortBy: str) -> list:
+        """
+        ordering keys of the query, the sortBy key followed by the selected primary keys
+        """
+        keys = [sortBy] if sortBy in self.selector.keys else []
+        return keys + [k for k in self.primary_keys() if k not in keys]
+
+    def keyset_nullable(self, sortBy: str) -> list:
+        nullable = []
+        for k in self.keyset(sortBy):
+            column = self.selector.columnsKeyPair[k]
+            column = getattr(column, "expression", column)
+            nullable.append(
+                getattr(column, "nullable", True) and not getattr(column, "primary_key", False)
+            )
+        return nullable
+
+    def sort_keyset(self, query: Select, sortBy: str, sortType: str, dialect=None) -> Select:
+        """
+        sort your query by the keyset so every row has a stable position
+        """
+        columns = [self.selector.columnsKeyPair[k] for k in self.keyset(sortBy)]
+        return query.order_by(
+            *order_keyset(columns, sortType, self.keyset_nullable(sortBy), dialect)
         )
-        countAfterFilter = countAfterFilter.scalars().one()
-        query = self.sort(query, self.getParams.sortBy, self.getParams.sortType)
-        query = self.paginate(query, self.getParams.page, self.getParams.limit)
-        datas = await self.selector.execute(session, query)
-        datas = self.filter(datas)
+
+    def seek(self, query: Select, cursor: str, sortBy: str, sortType: str, dialect=None) -> List[Select]:
+        """
+        queries of the rows right after the row the cursor refers to, in their order
+        """
+        values = decode_cursor(cursor, sortBy, sortType)
+        columns = [self.selector.columnsKeyPair[k] for k in self.keyset(sortBy)]
+        conditions = seek_conditions(
+            columns, values, sortType, self.keyset_nullable(sortBy), dialect
+        )
+        return [query.where(c) for c in conditions]
+
+    async def execute_pagination(self, session: AsyncSession, query: Select):
+        sortBy, sortType = self.getParams.sortBy, self.getParams.sortType
+        cursor = getattr(self.getParams, "cursor", None)
+        cursorMode = self.use_cursor()
+        if cursorMode and not self.primary_keys():
+            raise ValueError("Cursor pagination needs a primary key column in the selector")
+        keyset = self.keyset(sortBy)
+        filteredQuery = query
+        windowCount = self.use_window_count()
+        if not windowCount:
+            self.timer.lap("build")
+            countAfterFilter = await self.count(session, query)
+            self.timer.lap("count")
+        dialect = session_dialect(session)
+        query = self.sort_keyset(query, sortBy, sortType, dialect)
+        if cursor:
+            queries = self.seek(query, cursor, sortBy, sortType, dialect)
+            self.timer.lap("build")
+            datas = await self.execute_seek(
+                queries,
+                self.getParams.limit + 1,
+                lambda query: self.selector.execute(session, query)
+            )
+            self.timer.lap("query")
+        elif windowCount:
+            query = self.paginate(query, self.getParams.page, self.getParams.limit)
+            self.timer.lap("build")
+            query = await session.execute(query.add_columns(window_count_column()))
+            rows = query.all()
+            datas = [dict(zip(self.selector.keys, list(r)[:-1])) for r in rows]
+            self.timer.lap("query")
+            if rows:
+                countAfterFilter = rows[0][-1]
+            else:
+                countAfterFilter = await self.count_empty_page(session, filteredQuery)
+                self.timer.lap("count")
+        else:
+            query = self.paginate(query, self.getParams.page, self.getParams.limit)
+            if cursorMode:
+                query = query.limit(self.getParams.limit + 1)
+            self.timer.lap("build")
+            datas = await self.selector.execute(session, query)
+            self.timer.lap("query")
+        nextCursor = None
+        if cursorMode and len(datas) > self.getParams.limit:
+            datas = datas[:self.getParams.limit]
+            nextCursor = encode_cursor(sortBy, sortType, [datas[-1][k] for k in keyset])
+        datas = self.filter(datas[:self.getParams.limit])
+        self.timer.rows(len(datas))
+        self.timer.lap("serialize")
         return create_response(
             data={"list": datas},
             meta={
-                "page": self.getParams.page,
+                "page": None if cursorMode else self.getParams.page,
                 "length": self.getParams.limit,
                 "total": countAfterFilter,
+                "next_cursor": nextCursor,
             },
             status=status.success(),
         )
@@ -382,39 +853,558 @@ class BaseWhereClause:
         return newDict
 
 class BaseCRUD:
-    def __init__(self, classModel):
+    inChunkSize = 500
+    """
+    maximum values of a single 'IN' clause
+    """
+    insertChunkParams = 30000
+    """
+    maximum bound parameters of a single multi VALUES INSERT
+    """
+    exportBatchSize = 1000
+    """
+    rows fetched per batch while exporting
+    """
+    maxBatchIds = 1000
+    """
+    maximum ids of a single read batch
+    """
+
+    def __init__(
+            self,
+            classModel,
+            count_strategy: str = CountStrategy.exact,
+            count_cache: Optional[CountCache] = None,
+            delete_chunk_size: Optional[int] = None,
+            orm_delete: bool = False,
+            cache: Optional[CacheBackend] = None,
+            cache_ttl: float = 60,
+            metrics: Optional[Metrics] = None,
+            coalesce_window: Optional[float] = None,
+            singleflight: bool = False
+        ):
+        """
+        :params:
+        - classModel -> SQLAlchemy schema class model
+        - count_strategy -> default strategy to count the read many total
+        - count_cache -> cache of the 'cached' count strategy
+        - delete_chunk_size -> delete and commit in chunks of this size to keep locks short
+        - orm_delete -> delete through the session to apply the ORM cascades and events
+        - cache -> backend of the read one/read many result cache, disabled when None
+        - cache_ttl -> seconds a cached result is served
+        - metrics -> phase timers and counters of the operations, disabled when None
+        - coalesce_window -> seconds the concurrent read one by primary key wait to be
+        merged into a single 'IN' query, disabled when None
+        - singleflight -> the concurrent identical read one/read many share a single
+        in-flight execution and its result
+        """
         self.classModel = classModel
+        self.metadata = get_model_metadata(classModel)
+        self.serializer = get_row_serializer(classModel)
+        self.countStrategy = count_strategy
+        self.countCache = count_cache if count_cache else countCache
+        self.deleteChunkSize = delete_chunk_size
+        self.ormDelete = orm_delete
+        self.cache = ResultCache(cache, cache_ttl) if cache else None
+        self.metrics = metrics
+        self.coalescer = None
+        if coalesce_window is not None and len(self.metadata.primaryKeys) == 1:
+            self.coalescer = ReadOneCoalescer(self._coalesced_rows, coalesce_window, self.inChunkSize)
+        self.singleFlight = SingleFlight() if singleflight else None
 
     def where(self, *whereExpression, **whereClause):
         return BaseWhereClause(self.classModel, *whereExpression, **whereClause)
 
+    def paginator(self, getParams: CommonQueryGetter):
+        return QueryPaginator(getParams, self.classModel, self.countStrategy, self.countCache)
+
+    def _timer(self, operation: str):
+        """
+        timer of an operation, it does nothing when the metrics are disabled
+        """
+        if self.metrics is None:
+            return nullTimer
+        return self.metrics.timer(self.classModel.__tablename__, operation)
+
+    async def _after_write(self):
+        """
+        called after every committed write of this table
+        """
+        self.countCache.invalidate(self.classModel.__tablename__)
+        if self.cache is not None:
+            await self.cache.invalidate(self.classModel.__tablename__)
+
+    async def _cached(
+            self,
+            operation: str,
+            params: dict,
+            session: AsyncSession,
+            read,
+            timer=nullTimer,
+            encoded: bool = False
+        ):
+        """
+        serve the read from the result cache, 'read' is called on a miss and its
+        successful response is stored already encoded
+
+        the successful response is returned as its encoded JSON bytes when 'encoded'
+        (a hit is not decoded), otherwise as the response envelope
+
+        the database of the session is part of the key, a client reading from the
+        primary (read your writes) is not served what a replica read cached
+        """
+        if self.cache is None:
+            return await read()
+        params = dict(params, bind=bind_name(session))
+        key = await self.cache.key(self.classModel.__tablename__, operation, params)
+        body = await self.cache.get(key)
+        timer.lap("cache")
+        if body is None:
+            res = await read()
+            if res["status"]["code"] != StatusResponse.success:
+                return res
+            body = encode_json(res)
+            await self.cache.set(key, body)
+            timer.lap("cache")
+            if not encoded:
+                return res
+        if encoded:
+            return body
+        return json.loads(body)
+
+    def _shared(self, operation: str, params: dict, session: AsyncSession, read):
+        """
+        'read(session)' shared by the concurrent identical reads when singleflight is
+        enabled, the reads of different engines (ex: primary and replica) are not shared
+
+        the shared read runs on a session of its own, a cancelled caller (and its
+        closed session) does not fail the others. The sessions a dedicated session
+        can not reproduce (see 'session_configuration') read on their own
+        """
+        configuration = None
+        if self.singleFlight is not None:
+            configuration = session_configuration(session)
+        if configuration is None:
+            return lambda: read(session)
+        key = (configuration, operation, normalize_params(params))
+
+        async def shared_read():
+            async with dedicated_session(configuration) as sharedSession:
+                return await read(sharedSession)
+        return lambda: self.singleFlight.do(key, shared_read)
+
+    def _insert_values(self, data: dict) -> dict:
+        """
+        INSERT values of a row, the None of columns having a default is left out
+        so the database or column default applies (as the ORM does)
+        """
+        values = {}
+        for key, value in data.items():
+            column = self.metadata.columns.get(key)
+            if column is None or (value is None and column.hasDefault):
+                continue
+            values[column.column.key] = value
+        return values
+
+    async def _execute_isolated(self, session: AsyncSession, statement, rows: list) -> list:
+        """
+        execute the statement for the rows inside a savepoint, a failing batch is
+        bisected until the failing rows are found
+
+        return the errors aligned with the rows (None when it succeed)
+        """
+        try:
+            async with session.begin_nested():
+                await session.execute(statement, rows)
+            return [None] * len(rows)
+        except Exception as e:
+            if len(rows) == 1:
+                return [e]
+            middle = len(rows) // 2
+            errors = await self._execute_isolated(session, statement, rows[:middle])
+            return errors + await self._execute_isolated(session, statement, rows[middle:])
+
+    def _column_values(self, data: dict) -> dict:
+        """
+        statement values of the known fields, keyed by column key
+        """
+        return {
+            self.metadata.columns[k].column.key: v for k, v in data.items()
+            if k in self.metadata.fieldSet
+        }
+
+    async def _update_first(
+            self,
+            session: AsyncSession,
+            query: Select,
+            values: dict,
+            primaryKey: Optional[dict] = None
+        ) -> Optional[dict]:
+        """
+        UPDATE only the given values of the first row matching the query and commit,
+        return the updated row (by RETURNING when the dialect supports it)
+
+        - primaryKey -> primary key values of the row when they are already known
+
+        the conditions of the query are part of the UPDATE as well, a row which
+        does not match them anymore is not updated
+        """
+        pkColumns = {k: self.metadata.columns[k].column for k in self.metadata.primaryKeys}
+        if primaryKey is None:
+            row = await session.execute(query.with_only_columns(*pkColumns.values()).limit(1))
+            row = row.first()
+            if row is None:
+                return None
+            primaryKey = dict(zip(pkColumns, row))
+        statement = update(self.classModel.__table__).where(
+            *[c == primaryKey[k] for k, c in pkColumns.items()]
+        ).values(self._column_values(values))
+        if query.whereclause is not None:
+            statement = statement.where(query.whereclause)
+        fields = self.metadata.fields
+        columns = [self.metadata.columns[k].column for k in fields]
+        connection = await session.connection()
+        if support_returning(connection.dialect, "update"):
+            row = await session.execute(statement.returning(*columns))
+            row = row.first()
+        else:
+            result = await session.execute(statement)
+            row = None
+            if result.rowcount:
+                primaryKey = {k: values.get(k, v) for k, v in primaryKey.items()}
+                row = await session.execute(
+                    select(*columns).where(*[c == primaryKey[k] for k, c in pkColumns.items()])
+                )
+                row = row.first()
+        await session.commit()
+        if row is None:
+            return None
+        await self._after_write()
+        return self.serializer.compile(fields)(row)
+
+    def _projection(self, fields: Optional[str] = None) -> list:
+        """
+        validated fields (comma separated) to be responded, all fields when not
+        given or when none of them is valid
+        """
+        return QueryManager(self.classModel).projection(fields)
+
+    async def _insert_returning(self, session: AsyncSession, rows: list, fields: list) -> list:
+        """
+        INSERT the rows and return the created rows projected by the fields
+
+        an executemany INSERT ... RETURNING sorted by the parameters order is used
+        when the dialect supports it, without the sorting (SQLAlchemy < 2.0) the rows
+        are inserted one by one with RETURNING. Otherwise the rows are inserted one
+        by one to get their primary keys and selected back at once
+        """
+        table = self.classModel.__table__
+        columns = [self.metadata.columns[k].column for k in fields]
+        serialize = self.serializer.compile(fields)
+        connection = await session.connection()
+        created = [None] * len(rows)
+        if support_returning(connection.dialect, "insert"):
+            groups = {}
+            for i, row in enumerate(rows):
+                groups.setdefault(tuple(row), []).append(i)
+            for keys, indexes in groups.items():
+                if keys and sortedReturning:
+                    statement = insert(table).returning(*columns, sort_by_parameter_order=True)
+                    size = max(1, self.insertChunkParams // len(keys))
+                    for i in range(0, len(indexes), size):
+                        chunk = indexes[i:i + size]
+                        result = await session.execute(statement, [rows[j] for j in chunk])
+                        for j, row in zip(chunk, result.all()):
+                            created[j] = serialize(row)
+                    continue
+                for j in indexes:
+                    statement = insert(table)
+                    if keys:
+                        statement = statement.values(rows[j])
+                    result = await session.execute(statement.returning(*columns))
+                    created[j] = serialize(result.one())
+            return created
+        pkColumns = list(table.primary_key)
+        primaryKeys = []
+        for row in rows:
+            result = await session.execute(insert(table).values(row))
+            primaryKeys.append(tuple(result.inserted_primary_key))
+        positions = {pk: i for i, pk in enumerate(primaryKeys)}
+        for i in range(0, len(primaryKeys), self.inChunkSize):
+            chunk = primaryKeys[i:i + self.inChunkSize]
+            if len(pkColumns) == 1:
+                condition = pkColumns[0].in_([pk[0] for pk in chunk])
+            else:
+                condition = tuple_(*pkColumns).in_(chunk)
+            result = await session.execute(select(*columns, *pkColumns).where(condition))
+            for row in result.all():
+                created[positions[tuple(row[len(columns):])]] = serialize(row)
+        return created
+
+    async def _select_existing(self, session: AsyncSession, key: str, values: list) -> set:
+        """
+        the values of the column that exist in the table, queried by chunked 'IN'
+        """
+        column = self.classModel.__dict__[key]
+        values = list(set([v for v in values if v is not None]))
+        existing = set()
+        for i in range(0, len(values), self.inChunkSize):
+            data = await session.execute(
+                select(column).where(column.in_(values[i:i + self.inChunkSize]))
+            )
+            existing.update(data.scalars().all())
+        return existing
+
+    async def _select_by_keys(
+            self,
+            session: AsyncSession,
+            key: str,
+            values: list,
+            fields: list
+        ) -> Dict[Any, dict]:
+        """
+        the rows projected by the fields by their value of the key column,
+        queried by chunked 'IN'
+        """
+        column = self.metadata.columns[key].column
+        columns = [self.metadata.columns[k].column for k in fields]
+        serialize = self.serializer.compile(fields)
+        rows = {}
+        for i in range(0, len(values), self.inChunkSize):
+            data = await session.execute(
+                select(*columns, column).where(column.in_(values[i:i + self.inChunkSize]))
+            )
+            for row in data.all():
+                rows[row[-1]] = serialize(row)
+        return rows
+
+    async def _coalesced_rows(self, session: AsyncSession, fields: list, values: list) -> Dict[Any, dict]:
+        return await self._select_by_keys(session, self.metadata.primaryKeys[0], values, fields)
+
+    def _parse_ids(self, ids: Union[str, list], key: str) -> list:
+        """
+        distinct ids (comma separated) converted to the type of the key column
+        """
+        if isinstance(ids, str):
+            ids = [i.strip() for i in ids.split(",")]
+        pythonType = self.metadata.columns[key].pythonType
+        parsed = []
+        for i in ids:
+            if i == "" or i is None:
+                continue
+            if pythonType in (int, float, str):
+                try:
+                    i = pythonType(i)
+                except ValueError:
+                    raise ValueError(f"invalid id '{i}'")
+            parsed.append(i)
+        parsed = list(dict.fromkeys(parsed))
+        if len(parsed) > self.maxBatchIds:
+            raise ValueError(f"too many ids, the maximum is {self.maxBatchIds}")
+        return parsed
+
+    async def _delete_where(self, session: AsyncSession, query: Select) -> int:
+        """
+        DELETE the rows matching the query conditions and commit,
+        return the deleted rows count
+        """
+        table = self.classModel.__table__
+        if not self.deleteChunkSize:
+            statement = delete(table)
+            if query.whereclause is not None:
+                statement = statement.where(query.whereclause)
+            result = await session.execute(statement)
+            await session.commit()
+            return result.rowcount
+        primaryKeys = [self.metadata.columns[k].column for k in self.metadata.primaryKeys]
+        query = query.with_only_columns(*primaryKeys).limit(self.deleteChunkSize)
+        deleted = 0
+        while True:
+            ids = (await session.execute(query)).all()
+            if not ids:
+                break
+            if len(primaryKeys) == 1:
+                condition = primaryKeys[0].in_([i[0] for i in ids])
+            else:
+                condition = tuple_(*primaryKeys).in_([tuple(i) for i in ids])
+            result = await session.execute(delete(table).where(condition))
+            await session.commit()
+            deleted += result.rowcount
+            if len(ids) < self.deleteChunkSize:
+                break
+        return deleted
+
+    async def _execute_many(self, session: AsyncSession, statement, rows: list) -> list:
+        """
+        executemany the statement, rows are grouped by their keys so every group is
+        a single statement. When it fails the transaction is rolled back and the rows
+        are executed again in isolation to find which ones fail.
+
+        return the errors aligned with the rows (None when it succeed)
+        """
+        groups = {}
+        for i, row in enumerate(rows):
+            groups.setdefault(tuple(sorted(row)), []).append(i)
+        try:
+            for indexes in groups.values():
+                await session.execute(statement, [rows[i] for i in indexes])
+            return [None] * len(rows)
+        except Exception as e:
+            logger.error(str(e))
+            await session.rollback()
+        errors = [None] * len(rows)
+        for indexes in groups.values():
+            groupErrors = await self._execute_isolated(
+                session, statement, [rows[i] for i in indexes]
+            )
+            for i, error in zip(indexes, groupErrors):
+                errors[i] = error
+        return errors
+
     async def read_one(
             self,
             pydanticModel,
-            session: AsyncSession
+            session: AsyncSession,
+            fields: Optional[str] = None,
+            encoded: bool = False
+        ):
+        """
+        read the first row matching the pydantic model values,
+        only the columns of 'fields' (comma separated) are selected when given
+
+        - encoded -> a successful response read from the result cache is returned
+        as its encoded JSON bytes, without decoding it
+        """
+        timer = self._timer("read_one")
+        params = {"where": pydanticModel.dict(), "fields": fields}
+        read = self._shared(
+            "read_one", params, session, lambda s: self._read_one(pydanticModel, s, fields, timer)
+        )
+        res = await self._cached("read_one", params, session, read, timer, encoded)
+        timer.finish(res)
+        return res
+
+    async def _read_one(
+            self,
+            pydanticModel,
+            session: AsyncSession,
+            fields: Optional[str] = None,
+            timer=nullTimer
         ):
         try:
-            query = select(self.classModel)
-            for k, attr in pydanticModel.dict().items():
-                if k in vars(self.classModel):
+            queryManager = QueryManager(self.classModel)
+            fields = queryManager.projection(fields)
+            where = pydanticModel.dict()
+            if (
+                self.coalescer is not None
+                and list(where) == self.metadata.primaryKeys
+                and self.coalescer.can_coalesce(session)
+            ):
+                timer.lap("build")
+                data = await self.coalescer.get(session, fields, where[self.metadata.primaryKeys[0]])
+                timer.lap("query")
+                if data is not None:
+                    timer.rows(1)
+                return create_response(data=data, status=status.success())
+            await timer.checkout(session)
+            query = queryManager.project(queryManager.rawQuery, fields)
+            for k, attr in where.items():
+                if k in self.metadata.fieldSet:
                     query = query.where(vars(self.classModel)[k]==attr)
-            data = await session.execute(query)
-            data = data.scalars().first()
+            timer.lap("build")
+            data = await session.execute(query.limit(1))
+            data = data.first()
+            timer.lap("query")
+            if data is not None:
+                data = self.serializer.compile(fields)(data)
+                timer.rows(1)
             res = create_response(data=data, status=status.success())
+            timer.lap("serialize")
         except Exception as e:
             logger.error(str(e))
             res = create_response(status=status.error(e))
         return res
     
+    async def read_batch(
+            self,
+            ids: Union[str, list],
+            session: AsyncSession,
+            fields: Optional[str] = None
+        ):
+        """
+        read the rows of the primary key values 'ids' (comma separated) with a
+        single chunked 'IN' query, in the order of the ids.
+        The ids without a row are listed in 'missing'.
+        Only the tables with a single column primary key are supported.
+        """
+        timer = self._timer("read_batch")
+        try:
+            await timer.checkout(session)
+            if len(self.metadata.primaryKeys) != 1:
+                raise ValueError(
+                    f"read batch needs a single column primary key, "
+                    f"'{self.classModel.__tablename__}' has {len(self.metadata.primaryKeys)}"
+                )
+            key = self.metadata.primaryKeys[0]
+            ids = self._parse_ids(ids, key)
+            fields = self._projection(fields)
+            timer.lap("build")
+            rows = await self._select_by_keys(session, key, ids, fields)
+            timer.lap("query")
+            found = [rows[i] for i in ids if i in rows]
+            missing = [i for i in ids if i not in rows]
+            timer.rows(len(found))
+            res = create_response(
+                data={"list": found, "missing": missing},
+                meta={"total": len(found)},
+                status=status.success()
+            )
+        except Exception as e:
+            logger.error(str(e))
+            res = create_response(status=status.error(e))
+        timer.finish(res)
+        return res
+
     async def read_many(
             self,
             getParams: CommonQueryGetter,
             session: AsyncSession,
             whereClauseObject: Optional[BaseWhereClause] = None,
+            encoded: bool = False,
+            **whereClause
+        ):
+        """
+        read a page of the filtered rows
+
+        - encoded -> a successful response read from the result cache is returned
+        as its encoded JSON bytes, without decoding it (the where expressions are
+        not cached, they can not be part of the cache key, nor be shared by singleflight)
+        """
+        timer = self._timer("read_many")
+        read = lambda s: self._read_many(getParams, s, whereClauseObject, timer, **whereClause)
+        if whereClauseObject and whereClauseObject.we:
+            res = await read(session)
+        else:
+            where = dict(whereClauseObject.wc) if whereClauseObject else {}
+            where.update(whereClause)
+            params = {"params": vars(getParams), "where": where}
+            read = self._shared("read_many", params, session, read)
+            res = await self._cached("read_many", params, session, read, timer, encoded)
+        timer.finish(res)
+        return res
+
+    async def _read_many(
+            self,
+            getParams: CommonQueryGetter,
+            session: AsyncSession,
+            whereClauseObject: Optional[BaseWhereClause] = None,
+            timer=nullTimer,
             **whereClause
         ):
         try:
-            paginator = QueryPaginator(getParams, self.classModel)
+            await timer.checkout(session)
+            paginator = self.paginator(getParams)
+            paginator.timer = timer
             query = paginator.rawQuery
             if whereClauseObject:
                 query = whereClauseObject.applyWhereObject(query, whereClause)
@@ -424,55 +1414,185 @@ class BaseCRUD:
             res = create_response(status=status.error(e))
         return res
 
+    async def export(
+            self,
+            exportParams: CommonQueryExport,
+            session: AsyncSession,
+            whereClauseObject: Optional[BaseWhereClause] = None,
+            batch_size: Optional[int] = None,
+            **whereClause
+        ) -> AsyncIterator[bytes]:
+        """
+        stream all filtered rows as NDJSON or CSV chunks,
+        rows are fetched by a server side cursor in batches of 'batch_size'
+        """
+        if exportParams.format not in ExportMediaTypes:
+            raise ValueError(f"Invalid export format '{exportParams.format}'")
+        if not batch_size:
+            batch_size = self.exportBatchSize
+        timer = self._timer("export")
+        code = StatusResponse.error
+        try:
+            await timer.checkout(session)
+            paginator = QueryPaginatorSingle(exportParams, self.classModel)
+            fields = paginator.filterFields
+            query = paginator.rawQuery
+            if whereClauseObject:
+                query = whereClauseObject.applyWhereObject(query, whereClause)
+            query = paginator.project(query, fields)
+            query = paginator.sort_keyset(
+                query, exportParams.sortBy, exportParams.sortType, session_dialect(session)
+            )
+            timer.lap("build")
+            result = await session.stream(query.execution_options(yield_per=batch_size))
+            timer.lap("query")
+            if exportParams.format == ExportFormat.csv:
+                yield encode_csv(fields, [], header=True)
+                timer.lap("send")
+            async for rows in result.partitions(batch_size):
+                timer.lap("query")
+                timer.rows(len(rows))
+                if exportParams.format == ExportFormat.csv:
+                    chunk = encode_csv(fields, rows)
+                else:
+                    chunk = encode_ndjson(fields, rows)
+                timer.lap("serialize")
+                yield chunk
+                timer.lap("send")
+            timer.lap("query")
+            code = StatusResponse.success
+        finally:
+            timer.finish(code=code)
+
+    async def count_many(
+            self,
+            getParams: CommonQueryGetter,
+            session: AsyncSession,
+            whereClauseObject: Optional[BaseWhereClause] = None,
+            **whereClause
+        ):
+        """
+        count only, 'none' count strategy is counted exactly
+        """
+        timer = self._timer("count_many")
+        try:
+            await timer.checkout(session)
+            paginator = self.paginator(getParams)
+            strategy = paginator.get_count_strategy()
+            if strategy == CountStrategy.none:
+                strategy = CountStrategy.exact
+            query = paginator.rawQuery
+            if whereClauseObject:
+                query = whereClauseObject.applyWhereObject(query, whereClause)
+            timer.lap("build")
+            total = await paginator.count(session, query, strategy)
+            timer.lap("count")
+            res = create_response(meta={"total": total}, status=status.success())
+        except Exception as e:
+            logger.error(str(e))
+            res = create_response(status=status.error(e))
+        timer.finish(res)
+        return res
+
     async def read(self, getParams: CommonQueryGetter, session: AsyncSession):
         """
         with pagination
         """
+        timer = self._timer("read")
         try:
-            paginator = QueryPaginator(getParams, self.classModel)
+            await timer.checkout(session)
+            paginator = self.paginator(getParams)
+            paginator.timer = timer
             query = paginator.rawQuery
             res = await paginator.execute_pagination(session, query)
         except Exception as e:
             logger.error(str(e))
             res = create_response(status=status.error(e))
+        timer.finish(res)
         return res
 
-    async def create(self, pydanticModel, session: AsyncSession):
+    async def create(
+            self,
+            pydanticModel,
+            session: AsyncSession,
+            fields: Optional[str] = None,
+            returning: bool = False
+        ):
+        """
+        INSERT one row, the created row (projected by 'fields') is responded when
+        'returning' is set
+        """
+        timer = self._timer("create")
         try:
-            newData = self.classModel(**pydanticModel.dict())
-            session.add(newData)
+            await timer.checkout(session)
+            row = self._insert_values(pydanticModel.dict())
+            data = {}
+            if returning:
+                data = (await self._insert_returning(session, [row], self._projection(fields)))[0]
+            else:
+                await session.execute(insert(self.classModel.__table__).values(row))
             await session.commit()
-            await session.refresh(newData)
-            res = create_response(status=status.success())
+            timer.lap("write")
+            await self._after_write()
+            res = create_response(data=data, status=status.success())
         except Exception as e:
             logger.error(str(e))
             res = create_response(status=status.error(e))
+        timer.finish(res)
         return res
     
-    async def create_many(self, pydanticModelCollection, session: AsyncSession):
+    async def create_many(
+            self,
+            pydanticModelCollection,
+            session: AsyncSession,
+            fields: Optional[str] = None,
+            returning: bool = False
+        ):
+        """
+        bulk INSERT of all rows, nothing is committed when any row fails
+
+        the created rows (projected by 'fields') are responded in 'list' when
+        'returning' is set
+        """
+        timer = self._timer("create_many")
         try:
+            await timer.checkout(session)
             dataCollection = pydanticModelCollection.dict()[self.classModel.__tablename__]
-            createdObj = []
+            rows = [self._insert_values(data) for data in dataCollection or []]
+            errors = []
+            created = None
+            if rows and returning:
+                try:
+                    created = await self._insert_returning(session, rows, self._projection(fields))
+                    errors = [None] * len(rows)
+                except Exception as e:
+                    logger.error(str(e))
+                    await session.rollback()
+                    created = None
+            if rows and not errors:
+                errors = await self._execute_many(session, insert(self.classModel.__table__), rows)
             statuses = []
             successCreate = 0
             failCreate = 0
-            for data in dataCollection:
-                try:
-                    obj = self.classModel(**data)
-                    session.add(obj)
-                    createdObj.append(obj)                    
+            for error in errors:
+                if error is None:
                     successCreate += 1
                     statuses.append(status.success())
-                    await session.flush()
-                except Exception as e:
+                else:
                     failCreate += 1
-                    statuses.append(status.error(e))
-            if not failCreate:
+                    statuses.append(status.error(error))
+            if failCreate:
+                await session.rollback()
+                timer.lap("write")
+            else:
                 await session.commit()
-                for o in createdObj:
-                    await session.refresh(o)
+                timer.lap("write")
+                await self._after_write()
+            data = {"status": statuses}
+            if returning:
+                data["list"] = None if failCreate else created
             res = create_response(
-                data={"status":statuses},
+                data=data,
                 meta={
                     "succeed": successCreate,
                     "failed": failCreate
@@ -482,6 +1602,7 @@ class BaseCRUD:
         except Exception as e:
             logger.error(str(e))
             res = create_response(status=status.error(e))
+        timer.finish(res)
         return res
 
     async def update(
@@ -492,22 +1613,34 @@ class BaseCRUD:
             whereClauseObject: Optional[BaseWhereClause] = None,
             **whereClause
         ):
+        """
+        update the supplied values of the first matching row and respond with the updated row
+        """
+        timer = self._timer("update")
         try:
+            await timer.checkout(session)
             query = select(self.classModel)
             if id!=None:
                 query = query.where(self.classModel.id==id)
             if whereClauseObject:
                 query = whereClauseObject.applyWhereObject(query, whereClause)
-            data = await session.execute(query)
-            data = data.scalars().first()
+            primaryKey = None
+            if id != None and not whereClauseObject and self.metadata.primaryKeys == ["id"]:
+                primaryKey = {"id": id}
+            values = pydanticModel.dict(exclude_unset=True)
+            data = None
+            timer.lap("build")
+            if values:
+                data = await self._update_first(session, query, values, primaryKey)
+                timer.lap("write")
             if not data:
                 res = create_response(status=status.data_is_not_updated())
             else:
-                await update_data(session, self.classModel, data, pydanticModel)
-                res = create_response(status=status.success())
+                res = create_response(data=data, status=status.success())
         except Exception as e:
             logger.error(str(e))
             res = create_response(status=status.error(e))
+        timer.finish(res)
         return res
 
     async def update_one(
@@ -517,26 +1650,38 @@ class BaseCRUD:
             whereClauseObject: Optional[BaseWhereClause] = None,
             **whereClause
         ):
+        """
+        update the supplied values of the row matching the pydantic model fields
+        (ex: 'id') and respond with the updated row
+        """
+        timer = self._timer("update_one")
         try:
+            await timer.checkout(session)
             query = select(self.classModel)
+            conditions = {}
             for k, attr in pydanticModel.dict().items():
-                if k in vars(self.classModel):
+                if k in self.metadata.fieldSet:
+                    conditions[k] = attr
                     query = query.where(vars(self.classModel)[k]==attr)
             if whereClauseObject:
                 query = whereClauseObject.applyWhereObject(query, whereClause)
-            data = await session.execute(query)
-            data = data.scalars().first()
+            primaryKey = None
+            if not whereClauseObject and set(conditions) == set(self.metadata.primaryKeys):
+                primaryKey = {k: conditions[k] for k in self.metadata.primaryKeys}
+            values = pydanticModel.__dict__[self.classModel.__tablename__].dict(exclude_unset=True)
+            data = None
+            timer.lap("build")
+            if values:
+                data = await self._update_first(session, query, values, primaryKey)
+                timer.lap("write")
             if not data:
                 res = create_response(status=status.data_is_not_updated())
             else:
-                await update_data(
-                    session, self.classModel, data,
-                    pydanticModel.__dict__[self.classModel.__tablename__]
-                    )
-                res = create_response(status=status.success())
+                res = create_response(data=data, status=status.success())
         except Exception as e:
             logger.error(str(e))
             res = create_response(status=status.error(e))
+        timer.finish(res)
         return res
 
     async def update_many(
@@ -545,32 +1690,70 @@ class BaseCRUD:
             reference_key,
             session: AsyncSession
         ):
+        """
+        update all rows in one transaction with an executemany
+        'UPDATE ... WHERE reference_key = :key', rows whose reference key does
+        not exist are reported in 'unmatched'
+
+        only the fields given in a row are updated, the primary key is never written
+        """
+        timer = self._timer("update_many")
         try:
-            dataCollection = pydanticModelCollection.__dict__[self.classModel.__tablename__]
+            await timer.checkout(session)
+            if reference_key not in self.metadata.fieldSet:
+                raise ValueError(f"Invalid reference key '{reference_key}'")
+            dataCollection = pydanticModelCollection.__dict__[self.classModel.__tablename__] or []
+            dataCollection = [data.dict(exclude_unset=True) for data in dataCollection]
+            keys = [data.get(reference_key) for data in dataCollection]
+            existing = await self._select_existing(session, reference_key, keys)
+            rows = []
+            for data, key in zip(dataCollection, keys):
+                if key in existing:
+                    row = {
+                        self.metadata.columns[k].column.key: v for k, v in data.items()
+                        if k in self.metadata.fieldSet
+                        and k != reference_key
+                        and k not in self.metadata.primaryKeys
+                    }
+                    if row:
+                        row["_simplecrud_reference"] = key
+                    rows.append(row)
+            errors = [None] * len(rows)
+            written = [i for i, row in enumerate(rows) if row]
+            if written:
+                statement = update(self.classModel.__table__).where(
+                    self.metadata.columns[reference_key].column == bindparam("_simplecrud_reference")
+                )
+                writtenErrors = await self._execute_many(
+                    session, statement, [rows[i] for i in written]
+                )
+                for i, error in zip(written, writtenErrors):
+                    errors[i] = error
+                await session.commit()
+                timer.lap("write")
+                await self._after_write()
+            errors = iter(errors)
             statuses = []
+            matched = []
+            unmatched = []
             successUpdate = 0
             failUpdate = 0
-            for data in dataCollection:
-                try:                    
-                    query = select(self.classModel)
-                    query = self.where().applyWhereObject(
-                        query, {reference_key: data.dict()[reference_key]}
-                        )
-                    obj = await session.execute(query)
-                    obj = obj.scalars().first()
-                    if not obj:
-                        failUpdate += 1
-                        statuses.append(status.data_is_not_updated())
-                    else:
-                        await update_data(session, self.classModel, obj, data)
-                        successUpdate += 1
-                        statuses.append(status.success())
-                except Exception as e:
-                    logger.error(str(e))
+            for key in keys:
+                if key not in existing:
+                    failUpdate += 1
+                    unmatched.append(key)
+                    statuses.append(status.data_is_not_updated())
+                    continue
+                error = next(errors)
+                if error is None:
+                    successUpdate += 1
+                    matched.append(key)
+                    statuses.append(status.success())
+                else:
                     failUpdate += 1
-                    statuses.append(status.error(e))
+                    statuses.append(status.error(error))
             res = create_response(
-                data={"status": statuses},
+                data={"status": statuses, "matched": matched, "unmatched": unmatched},
                 meta={
                     "succeed": successUpdate,
                     "failed": failUpdate
@@ -580,6 +1763,7 @@ class BaseCRUD:
         except Exception as e:
             logger.error(str(e))
             res = create_response(status=status.error(e))
+        timer.finish(res)
         return res
 
     async def delete(
@@ -589,24 +1773,28 @@ class BaseCRUD:
             whereClauseObject: Optional[BaseWhereClause] = None,
             **whereClause
         ):
+        timer = self._timer("delete")
         try:
+            await timer.checkout(session)
             query = select(self.classModel)
             if id != None:
                 query = query.where(self.classModel.id == id)
             if whereClauseObject:
                 query = whereClauseObject.applyWhereObject(query, whereClause)
-            data = await session.execute(query)
-            data = data.scalars().all()
-            if not data:
+            if self.ormDelete:
+                deleted = await self._delete_orm(session, query)
+            else:
+                deleted = await self._delete_where(session, query)
+            timer.lap("write")
+            if not deleted:
                 res = create_response(status=status.data_is_not_exist())
             else:
-                for d in data:
-                    await session.delete(d)
-                await session.commit()
+                await self._after_write()
                 res = create_response(status=status.success())
         except Exception as e:
             logger.error(str(e))
             res = create_response(status=status.error(e))
+        timer.finish(res)
         return res
     
     async def delete_many(
@@ -614,41 +1802,66 @@ class BaseCRUD:
             deleteParamsPydantic,
             session: AsyncSession
         ):
+        timer = self._timer("delete_many")
         try:
-            statuses = []
-            successDelete = 0
-            failDelete = 0
+            await timer.checkout(session)
             query = select(self.classModel)
             query = self.where().applyWhereObject(query, deleteParamsPydantic.dict())
-            datas = await session.execute(query)
-            datas = datas.scalars().all()
-            for data in datas:
-                try:
-                    if not data:
-                        failDelete += 1
-                        statuses.append(status.data_is_not_exist())
-                    else:
-                        await session.delete(data)
-                        successDelete += 1
-                        statuses.append(status.success())
-                except Exception as e:
-                    logger.error(e)
-                    failDelete += 1
-                    statuses.append(status.error(e))
-            await session.commit()
+            if self.ormDelete:
+                successDelete = await self._delete_orm(session, query)
+            else:
+                successDelete = await self._delete_where(session, query)
+            timer.lap("write")
+            await self._after_write()
             res = create_response(
-                data={"status": statuses},
+                data={"status": [status.success()] * successDelete},
                 meta={
                     "succeed": successDelete,
-                    "failed": failDelete
+                    "failed": 0
                 },
                 status=status.success()
                 )
         except Exception as e:
             logger.error(str(e))
             res = create_response(status=status.error(e))
+        timer.finish(res)
         return res
 
+    async def _delete_orm(self, session: AsyncSession, query: Select) -> int:
+        """
+        load and delete the rows one by one through the session, so the ORM
+        cascades and events are applied
+        """
+        data = await session.execute(query)
+        data = data.scalars().all()
+        for d in data:
+            await session.delete(d)
+        await session.commit()
+        return len(data)
+
+_pydanticModels: Dict[tuple, Any] = {}
+"""
+generated pydantic models by their generation options
+"""
+
+def _pydantic_model_key(classModel, modelName, exclude_attributes, *options) -> Optional[tuple]:
+    excluded = []
+    for ex_at in exclude_attributes:
+        if type(ex_at) != str:
+            ex_at = ex_at.__str__().split(".")[1]
+        excluded.append(ex_at)
+    key = [classModel, modelName, frozenset(excluded)]
+    for option in options:
+        if isinstance(option, dict):
+            option = tuple(sorted(option.items(), key=lambda i: i[0]))
+        key.append(option)
+    key = tuple(key)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
 def generate_pydantic_model(
         classModel: decl_api.DeclarativeMeta,
         modelName: str = "",
@@ -674,7 +1887,20 @@ def generate_pydantic_model(
     - include_attributes_paramsType -> Set the columns fastapi params type
     - uniform_attributes_default -> Set the default attributes to be applied to all columns
     - uniform_attributes_paramsType -> Set the params type to be applied to all columns
+
+    the model is generated once per options, the same options return the same model
     """
+    cacheKey = _pydantic_model_key(
+        classModel,
+        modelName,
+        exclude_attributes,
+        include_attributes_default,
+        include_attributes_paramsType,
+        uniform_attributes_default,
+        uniform_attributes_paramsType
+    )
+    if cacheKey in _pydanticModels:
+        return _pydanticModels[cacheKey]
     annots = get_annotation(classModel)
     for ex_at in exclude_attributes:
         if type(ex_at) != str:
@@ -725,66 +1951,12 @@ def generate_pydantic_model(
                     annots[key] = (dataType, at_ptype(default=defVal))
     if not modelName: modelName = classModel.tablename+"Pydantic"
     ModelPydantic = create_model(modelName, **annots)
+    if cacheKey is not None:
+        _pydanticModels[cacheKey] = ModelPydantic
     return ModelPydantic
 
 def get_annotation(classModel: decl_api.DeclarativeMeta):
     try:
-        fields = [i for i in vars(classModel) if "_" not in [i[0], i[-1]]]
-        keyValuePair = {}
-        for f in fields:
-            if "comparator" in classModel.__dict__[f].__dict__:
-                if "column" in str(classModel.__dict__[f].__dict__["comparator"]).lower():
-                    comp = classModel.__dict__[f].__dict__["comparator"]
-                    if "VARCHAR" in str(comp.type):
-                        if "enum_class" in comp.type.__dict__:
-                            if comp.nullable:
-                                defaultValue = comp.default.arg if comp.default else None
-                                keyValuePair[f] = (Optional[comp.type.enum_class], defaultValue)
-                            else:
-                                defaultValue = comp.default.arg if comp.default else None
-                                keyValuePair[f] = (comp.type.enum_class, defaultValue)
-                        else:
-                            if comp.nullable:
-                                defaultValue = comp.default.arg if comp.default else None
-                                keyValuePair[f] = (Optional[str], defaultValue)
-                            else:
-                                defaultValue = comp.default.arg if comp.default else None
-                                keyValuePair[f] = (str, defaultValue)
-                    elif "TEXT" in str(comp.type):
-                        if comp.nullable:
-                            defaultValue = comp.default.arg if comp.default else None
-                            keyValuePair[f] = (Optional[str], defaultValue)
-                        else:
-                            defaultValue = comp.default.arg if comp.default else None
-                            keyValuePair[f] = (str, defaultValue)
-                    elif "BOOLEAN" in str(comp.type):
-                        if comp.nullable:
-                            defaultValue = comp.default.arg if comp.default else None
-                            keyValuePair[f] = (Optional[bool], defaultValue)
-                        else:
-                            defaultValue = comp.default.arg if comp.default else None
-                            keyValuePair[f] = (bool, defaultValue)
-                    elif "INTEGER" in str(comp.type):
-                        if comp.nullable:
-                            defaultValue = comp.default.arg if comp.default else None
-                            keyValuePair[f] = (Optional[int], defaultValue)
-                        else:
-                            defaultValue = comp.default.arg if comp.default else None
-                            keyValuePair[f] = (int, defaultValue)
-                    elif "FLOAT" in str(comp.type):
-                        if comp.nullable:
-                            defaultValue = comp.default.arg if comp.default else None
-                            keyValuePair[f] = (Optional[float], defaultValue)
-                        else:
-                            defaultValue = comp.default.arg if comp.default else None
-                            keyValuePair[f] = (float, defaultValue)
-                    elif "DATETIME" in str(comp.type):
-                        if comp.nullable:
-                            defaultValue = None
-                            keyValuePair[f] = (Optional[datetime], defaultValue)
-                        else:
-                            defaultValue = None
-                            keyValuePair[f] = (datetime, defaultValue)
-        return keyValuePair
+        return get_model_metadata(classModel).get_annotation()
     except:
-        return {}
\ No newline at end of file
+        return {}
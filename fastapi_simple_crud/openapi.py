@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Optional
+
+import fastapi
+from fastapi import FastAPI
+from fastapi.dependencies.utils import get_flat_dependant
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from sqlalchemy.orm import decl_api
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import BaseRoute, Route
+
+from .dependencies.log import logger
+from .dependencies.response import encode_json, etag_matches, make_etag
+
+
+def package_version() -> str:
+    try:
+        from importlib.metadata import version
+        return version("fastapi-simple-crud")
+    except Exception:
+        return "unknown"
+
+
+def has_lazy_routes(app: FastAPI) -> bool:
+    """
+    whether some routers of the application are lazy placeholders not set up yet
+    """
+    return any(getattr(route, "lazyPlaceholder", False) for route in app.routes)
+
+
+def materialize_lazy_routes(app: FastAPI):
+    """
+    set up the lazy routers of the application, their routes replace their placeholders
+    """
+    for route in list(app.routes):
+        if getattr(route, "lazyPlaceholder", False):
+            route.materialize()
+
+
+def _type_signature(annotation):
+    """
+    the pydantic models are described by their schema so a change of their fields
+    changes the signature
+    """
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return [annotation.__name__, annotation.schema()]
+    args = getattr(annotation, "__args__", None)
+    if args:
+        return [repr(annotation), [_type_signature(a) for a in args]]
+    return repr(annotation)
+
+
+def route_signature(route: BaseRoute) -> list:
+    """
+    what the OpenAPI operation of a route is made of
+    """
+    signature = [
+        type(route).__name__,
+        getattr(route, "path", None),
+        sorted(getattr(route, "methods", None) or []),
+        getattr(route, "name", None),
+    ]
+    if not isinstance(route, APIRoute):
+        return signature
+    dependant = get_flat_dependant(route.dependant, skip_repeats=True)
+    params = []
+    for kind in ["path_params", "query_params", "header_params", "cookie_params", "body_params"]:
+        for field in getattr(dependant, kind):
+            params.append([
+                kind, field.name, field.alias, _type_signature(field.outer_type_),
+                field.required, repr(field.default)
+            ])
+    responses = {}
+    for code, response in (route.responses or {}).items():
+        responses[str(code)] = [
+            _type_signature(response.get("model")),
+            {k: v for k, v in response.items() if k != "model"}
+        ]
+    signature += [
+        route.include_in_schema, route.status_code, route.operation_id, route.tags,
+        route.summary, route.description, route.response_description, route.deprecated,
+        _type_signature(route.response_model), responses, params,
+    ]
+    return signature
+
+
+def schema_fingerprint(app: FastAPI, base: Optional[decl_api.DeclarativeMeta] = None) -> str:
+    """
+    fingerprint of what the OpenAPI schema is made of: the application info, the
+    package versions, its routes (parameters and response models included) and
+    the tables of the declarative base
+    """
+    fingerprint = hashlib.sha256()
+    fingerprint.update(repr([
+        app.title, app.version, app.openapi_version, app.description,
+        fastapi.__version__, package_version()
+    ]).encode())
+    for route in app.routes:
+        fingerprint.update(
+            json.dumps(route_signature(route), sort_keys=True, default=repr).encode()
+        )
+    if base is not None:
+        for table in sorted(base.metadata.tables.values(), key=lambda t: t.fullname):
+            fingerprint.update(repr(table).encode())
+    return fingerprint.hexdigest()[:16]
+
+
+class OpenAPICache:
+    """
+    Build the OpenAPI schema of the application once and serve its encoded bytes
+
+    - directory -> persist the schema in '<directory>/openapi-<fingerprint>.json'
+    so the other workers (and the next starts) load it instead of building it,
+    the lazy routers are set up first so their routes are part of the fingerprint
+    - base -> declarative base of the generated routers, part of the fingerprint
+    - warmup -> build the schema in a thread on startup
+
+    the schema is built in a thread, a request waiting for it does not block the event loop
+    """
+
+    def __init__(
+            self,
+            app: FastAPI,
+            base: Optional[decl_api.DeclarativeMeta] = None,
+            directory: Optional[str] = None,
+            warmup: bool = True
+        ):
+        self.app = app
+        self.base = base
+        self.directory = directory
+        self.body: Optional[bytes] = None
+        self.etag: Optional[str] = None
+        self._openapi = app.openapi
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        app.openapi = self.openapi
+        self._replace_route()
+        if warmup:
+            app.add_event_handler("startup", self.start_warmup)
+
+    @property
+    def path(self) -> Optional[str]:
+        """
+        file of the persisted schema, None while some lazy routers are not set up
+        as their routes are not known by the fingerprint yet
+        """
+        if not self.directory or has_lazy_routes(self.app):
+            return None
+        fingerprint = schema_fingerprint(self.app, self.base)
+        return os.path.join(self.directory, f"openapi-{fingerprint}.json")
+
+    def _replace_route(self):
+        routes = self.app.router.routes
+        for i, route in enumerate(routes):
+            if isinstance(route, Route) and route.path == self.app.openapi_url:
+                routes[i] = Route(self.app.openapi_url, self.endpoint, include_in_schema=False)
+                return
+
+    def _load(self, path: Optional[str]) -> Optional[bytes]:
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError as e:
+            logger.warning(f"cached OpenAPI schema is not readable: {e}")
+            return None
+
+    def _store(self, path: Optional[str], body: bytes):
+        if not path:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as f:
+                f.write(body)
+            os.replace(temporary, path)
+        except OSError as e:
+            logger.warning(f"OpenAPI schema is not cached: {e}")
+
+    def build(self) -> bytes:
+        """
+        the encoded schema, loaded from the directory or built once
+        """
+        with self._lock:
+            if self.body is None:
+                materialize_lazy_routes(self.app)
+                path = self.path
+                body = self._load(path)
+                if body is None:
+                    schema = self._openapi()
+                    body = encode_json(schema)
+                    self._store(path, body)
+                else:
+                    schema = json.loads(body)
+                self.app.openapi_schema = schema
+                self.etag = make_etag(body)
+                self.body = body
+        return self.body
+
+    def openapi(self) -> dict:
+        self.build()
+        return self.app.openapi_schema
+
+    def start_warmup(self):
+        if self.body is None and self._thread is None:
+            self._thread = threading.Thread(target=self.build, name="openapi-warmup", daemon=True)
+            self._thread.start()
+
+    def clear(self):
+        with self._lock:
+            self.body = None
+            self.etag = None
+            self.app.openapi_schema = None
+
+    async def endpoint(self, request: Request) -> Response:
+        if self.body is None:
+            await run_in_threadpool(self.build)
+        headers = {"ETag": self.etag}
+        if etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
+
+
+def cache_openapi(
+        app: FastAPI,
+        base: Optional[decl_api.DeclarativeMeta] = None,
+        directory: Optional[str] = None,
+        warmup: bool = True
+    ) -> OpenAPICache:
+    """
+    Serve the OpenAPI schema of the application from a cache, call it after the
+    routers are generated
+
+    :params:
+    - app -> FastAPI Application
+    - base -> SQLAlchemy declarative base, its tables are part of the file fingerprint
+    - directory -> directory where the schema is persisted, keyed by its fingerprint
+    - warmup -> build the schema in a thread on startup
+    """
+    return OpenAPICache(app, base, directory, warmup)
@@ -1,23 +1,39 @@
 from fastapi import FastAPI, APIRouter, Depends, Request, Path, Query, Body
 from fastapi.encoders import SetIntStr, DictIntStrAny
 from fastapi.routing import APIRoute
-from fastapi.datastructures import Default
+from fastapi.datastructures import Default, DefaultPlaceholder
 from pydantic import BaseConfig, BaseModel, create_model
 from pydantic.fields import ModelField
 from starlette.routing import BaseRoute
-from starlette.responses import Response, JSONResponse
+from starlette.responses import Response, JSONResponse, StreamingResponse
 from starlette.types import ASGIApp
 from typing import Optional, List, Sequence, Type, Any, Callable, Union, Dict
 from sqlalchemy.orm import decl_api
 from sqlalchemy.ext.asyncio import AsyncSession
 from types import FunctionType
+from functools import cached_property
 from datetime import datetime
 
-from .dependencies.utils import BaseCRUD, generate_pydantic_model
-from .dependencies.utility import CommonQueryGetter
+from .dependencies.utils import BaseCRUD, generate_pydantic_model, create_response, status
+from .dependencies.utils import ExportFormat, ExportMediaTypes
+from .dependencies.utility import CommonQueryGetter, CommonQuerySelectFields, CommonQueryExport
+from .dependencies.utility import CommonQueryBatch
+from .dependencies.count import CountStrategy, validate_count_strategy
+from .dependencies.cache import CacheBackend
+from .dependencies.metrics import Metrics, mark_request_start
+from .dependencies.statements import statement_budget
+from .dependencies.replica import ReadYourWrites, route_session_opener, route_sessions
+from .dependencies.response import FastJSONResponse, conditional_response, encoded_response
+from .dependencies.serializer import get_response_models
+from .dependencies.status import StatusResponse
 
 
 class SimpleEndpoint:
+    nonRouteAttributes = ["enable", "modelPydantic", "etag", "cacheControl", "sqlBudget"]
+    """
+    attributes used by the router only, they are not passed to the route
+    """
+
     def __init__(self, 
             path: str = "",
             enable: bool = True,
@@ -42,7 +58,10 @@ class SimpleEndpoint:
             name: Optional[str] = None,
             callbacks: Optional[List[BaseRoute]] = None,
             openapi_extra: Optional[Dict[str, Any]] = None,
-            pydantic_model: Optional[BaseModel] = None
+            pydantic_model: Optional[BaseModel] = None,
+            etag: bool = False,
+            cache_control: Optional[str] = None,
+            sql_budget: Optional[int] = None
         ):
         self.enable = enable
         self.path = path
@@ -68,13 +87,26 @@ class SimpleEndpoint:
         self.callbacks = callbacks
         self.openapi_extra = openapi_extra
         self.modelPydantic = pydantic_model
+        self.etag = etag
+        self.cacheControl = cache_control
+        self.sqlBudget = sql_budget
     
     def get_endpoint_kwargs(self, exclude_attributes: Optional[List[str]]=[]):
         params = vars(self).copy()
-        for key in exclude_attributes:
-            params.pop(key)
+        for key in set(self.nonRouteAttributes + list(exclude_attributes)):
+            params.pop(key, None)
+        if "dependencies" in params:
+            params["dependencies"] = self.get_dependencies()
         return params    
 
+    def get_dependencies(self) -> Optional[List[Depends]]:
+        """
+        dependencies of the route, the SQL statements budget is set by the first one
+        """
+        if self.sqlBudget is None:
+            return self.dependencies
+        return [Depends(statement_budget(self.sqlBudget))] + list(self.dependencies or [])
+
 
 class SimpleRouter(APIRouter):
     """
@@ -87,7 +119,7 @@ class SimpleRouter(APIRouter):
             prefix: str = "",
             tags: Optional[List[str]] = None,
             dependencies: Optional[Sequence[Depends]] = None,
-            default_response_class: Type[Response] = Default(JSONResponse),
+            default_response_class: Type[Response] = Default(FastJSONResponse),
             responses: Optional[Dict[Union[int, str], Dict[str, Any]]] = None,
             callbacks: Optional[List[BaseRoute]] = None,
             routes: Optional[List[BaseRoute]] = None,
@@ -103,13 +135,33 @@ class SimpleRouter(APIRouter):
             crud_read: Union[SimpleEndpoint, bool, None] = True,
             crud_update: Union[SimpleEndpoint, bool, None] = True,
             crud_delete: Union[SimpleEndpoint, bool, None] = True,
-            disable_crud: bool = False
+            disable_crud: bool = False,
+            count_strategy: str = CountStrategy.exact,
+            delete_chunk_size: Optional[int] = None,
+            orm_delete: bool = False,
+            return_created: bool = False,
+            cache: Optional[CacheBackend] = None,
+            cache_ttl: float = 60,
+            metrics: Optional[Metrics] = None,
+            read_session_getter: Optional[FunctionType] = None,
+            read_your_writes: Optional[float] = None,
+            coalesce_window: Optional[float] = None,
+            singleflight: bool = False
         ):
         self.classModel = classModel
+        self.returnCreated = return_created
         self.tablename = classModel.__tablename__
-        self.modelPydanticforCreate = generate_pydantic_model(self.classModel, modelName=self.tablename+"PydanticSimpleCreate")
-        self.modelPydanticforUpdate = generate_pydantic_model(self.classModel, modelName=self.tablename+"PydanticSimpleUpdate", exclude_attributes=["id"])
-        self.crud = BaseCRUD(classModel)
+        self.crud = BaseCRUD(
+            classModel,
+            count_strategy=validate_count_strategy(count_strategy),
+            delete_chunk_size=delete_chunk_size,
+            orm_delete=orm_delete,
+            cache=cache,
+            cache_ttl=cache_ttl,
+            metrics=metrics,
+            coalesce_window=coalesce_window,
+            singleflight=singleflight
+            )
         if not tags: tags = [self.tablename]
         if not prefix: prefix = f"/{self.tablename}"
         super().__init__(
@@ -162,17 +214,137 @@ class SimpleRouter(APIRouter):
             else:
                 self.crud_delete = SimpleEndpoint(enable=False)
         self._get_session = None
+        self._get_read_session = read_session_getter
+        self.readYourWrites = ReadYourWrites(read_your_writes) if read_your_writes else None
     
     def set_the_get_session(self, method: FunctionType):
         self._get_session = method
-        
+
+    def set_the_get_read_session(self, method: FunctionType, read_your_writes: Optional[float] = None):
+        """
+        Set the session getter of the reads (read one/many, count and export),
+        the writes keep the session getter
+        - read_your_writes -> seconds a client reads from the write session after its writes
+        """
+        self._get_read_session = method
+        if read_your_writes is not None:
+            self.readYourWrites = ReadYourWrites(read_your_writes) if read_your_writes else None
+
+    def _setup_sessions(self):
+        self._readSession, self._writeSession = route_sessions(
+            self._get_session, self._get_read_session, self.readYourWrites
+        )
+        self._readSessionOpener = route_session_opener(
+            self._get_session, self._get_read_session, self.readYourWrites
+        )
+
+    def set_metrics(self, metrics: Optional[Metrics]):
+        """
+        Set the metrics of the CRUD operations, before the router is set up
+        """
+        self.crud.metrics = metrics
+
+    def _setup_metrics(self):
+        """
+        the request start is marked by the first dependency, the time until the
+        CRUD operation starts is its 'dependencies' phase
+        """
+        if self.crud.metrics is not None:
+            self.dependencies.insert(0, Depends(mark_request_start))
+
+    @cached_property
+    def modelPydanticforCreate(self) -> Type[BaseModel]:
+        return generate_pydantic_model(self.classModel, modelName=self.tablename+"PydanticSimpleCreate")
+
+    @cached_property
+    def modelPydanticforUpdate(self) -> Type[BaseModel]:
+        return generate_pydantic_model(self.classModel, modelName=self.tablename+"PydanticSimpleUpdate", exclude_attributes=["id"])
+
+    @cached_property
+    def modelPydanticforQuery(self) -> Type[BaseModel]:
+        return generate_pydantic_model(self.classModel, modelName=self.tablename+"PydanticSimpleQuery", uniform_attributes_paramsType=Query)
+
+    def _document_response(self, kargs: dict, model: Type[BaseModel]):
+        """
+        document the response model in OpenAPI, the response is not validated
+        """
+        if kargs["response_model"] is not None:
+            return
+        responses = dict(kargs["responses"] or {})
+        responses.setdefault(kargs["status_code"] or 200, {"model": model})
+        kargs["responses"] = responses
+
+    def _response_class(self, endpoint: SimpleEndpoint) -> Type[Response]:
+        responseClass = endpoint.response_class
+        if isinstance(responseClass, DefaultPlaceholder):
+            responseClass = self.default_response_class
+        if isinstance(responseClass, DefaultPlaceholder):
+            responseClass = responseClass.value
+        return responseClass
+
+    def _respond(self, res, endpoint: SimpleEndpoint, request: Optional[Request] = None):
+        """
+        response of a CRUD result
+
+        - the envelope is rendered directly by a FastJSONResponse response class,
+        without 'jsonable_encoder', an encoded envelope (result cache hit) is sent as it is
+        - 'ETag'/'Cache-Control' of the endpoint are added to the successful reads
+        - the result is left to FastAPI when the endpoint has a response_model
+        - the client of a write is pinned to the write session (read your writes)
+        """
+        if endpoint.response_model is not None:
+            return res
+        if isinstance(res, bytes):
+            res = encoded_response(res)
+        success = isinstance(res, Response) or res["status"]["code"] == StatusResponse.success
+        read = request is not None and request.method in ("GET", "HEAD")
+        if read and success and (endpoint.etag or endpoint.cacheControl):
+            res = conditional_response(request, res, endpoint.etag, endpoint.cacheControl)
+        elif not isinstance(res, Response):
+            responseClass = self._response_class(endpoint)
+            if not issubclass(responseClass, FastJSONResponse):
+                return res
+            res = responseClass(content=res)
+        if endpoint.status_code and res.status_code == 200:
+            res.status_code = endpoint.status_code
+        if request is not None and getattr(request.state, "simplecrudPrimaryPin", None):
+            request.state.simplecrudPrimaryPin.pin(res)
+        return res
+
+    def _setup_count(self, endpoint: SimpleEndpoint, modelPydantic_: Type[BaseModel]):
+        """
+        HEAD on the read many path, it returns the total in 'X-Total-Count' header
+        """
+        @self.api_route(
+                endpoint.path,
+                methods=["HEAD"],
+                name="count "+self.tablename,
+                dependencies=endpoint.get_dependencies(),
+                include_in_schema=endpoint.include_in_schema
+            )
+        async def base_head_many(
+                request: Request,
+                readParams = Depends(modelPydantic_),
+                getParams = Depends(CommonQueryGetter),
+                session: AsyncSession = Depends(self._readSession)
+            ):
+            wc = self.crud.where(**readParams.dict())
+            res = await self.crud.count_many(getParams, session, wc)
+            if res["status"]["code"] != StatusResponse.success:
+                return Response(status_code=400)
+            return Response(headers={"X-Total-Count": str(res["meta"]["total"])})
+
     def _setup_crud(self):
+        self.responseModels = get_response_models(self.classModel)
+        self._setup_metrics()
+        self._setup_sessions()
         if self.crud_create.enable:
             kargs = self.crud_create.get_endpoint_kwargs(
                 exclude_attributes=["enable","modelPydantic"]
                 )
             if not kargs["name"]:
                 kargs["name"] = "create "+self.tablename
+            self._document_response(kargs, self.responseModels.one)
             if self.crud_create.modelPydantic:
                 modelPydantic_ = self.crud_create.modelPydantic
             else:
@@ -182,9 +354,12 @@ class SimpleRouter(APIRouter):
             async def base_post(
                     request: Request,
                     modelPydantic: modelPydantic_,
-                    session: AsyncSession = Depends(self._get_session)
+                    selectFields = Depends(CommonQuerySelectFields),
+                    session: AsyncSession = Depends(self._writeSession)
                 ):
-                return await self.crud.create(modelPydantic, session)
+                returning = self.returnCreated or bool(selectFields.fields)
+                res = await self.crud.create(modelPydantic, session, selectFields.fields, returning)
+                return self._respond(res, self.crud_create, request)
         
         if self.crud_read.enable:
             kargs = self.crud_read.get_endpoint_kwargs(
@@ -192,24 +367,25 @@ class SimpleRouter(APIRouter):
                 )
             if not kargs["name"]:
                 kargs["name"] = "read many "+self.tablename
+            self._document_response(kargs, self.responseModels.many)
             if self.crud_read.modelPydantic:
                 modelPydantic_ = self.crud_read.modelPydantic
             else:
-                modelPydantic_ = generate_pydantic_model(
-                    classModel=self.classModel,
-                    modelName=self.tablename+"PydanticSimpleReadMany",
-                    uniform_attributes_paramsType=Query
-                )
+                modelPydantic_ = self.modelPydanticforQuery
                 self.crud_read.modelPydantic = modelPydantic_
             @self.get(**kargs)
             async def base_get_many(
                     request: Request,
                     readParams = Depends(modelPydantic_),
                     getParams = Depends(CommonQueryGetter),
-                    session: AsyncSession = Depends(self._get_session)
+                    session: AsyncSession = Depends(self._readSession)
                 ):
                 wc = self.crud.where(**readParams.dict())
-                return await self.crud.read_many(getParams, session, wc)
+                res = await self.crud.read_many(
+                    getParams, session, wc, encoded=self.crud_read.response_model is None
+                )
+                return self._respond(res, self.crud_read, request)
+            self._setup_count(self.crud_read, modelPydantic_)
 
         if self.crud_update.enable:
             kargs = self.crud_update.get_endpoint_kwargs(
@@ -217,14 +393,11 @@ class SimpleRouter(APIRouter):
                 )
             if not kargs["name"]:
                 kargs["name"] = "update one "+self.tablename
+            self._document_response(kargs, self.responseModels.one)
             if self.crud_update.modelPydantic:
                 modelPydantic_ = self.crud_update.modelPydantic
             else:
-                premodelPydantic_ = generate_pydantic_model(
-                    classModel=self.classModel,
-                    modelName=self.tablename+"PydanticSimpleUpdateOne",
-                    exclude_attributes=["id"],
-                )
+                premodelPydantic_ = self.modelPydanticforUpdate
                 modelPydantic_ = create_model(
                     self.tablename+"PydanticSimpleUpdateOnePacked",
                     **{
@@ -237,9 +410,10 @@ class SimpleRouter(APIRouter):
             async def base_put(
                     request: Request,
                     modelPydantic: modelPydantic_ = Depends(),
-                    session: AsyncSession = Depends(self._get_session)
+                    session: AsyncSession = Depends(self._writeSession)
                 ):
-                return await self.crud.update_one(modelPydantic, session)
+                res = await self.crud.update_one(modelPydantic, session)
+                return self._respond(res, self.crud_update, request)
 
         if self.crud_delete.enable:
             kargs = self.crud_delete.get_endpoint_kwargs(
@@ -251,9 +425,10 @@ class SimpleRouter(APIRouter):
             async def base_delete(
                     request: Request,
                     id: int = Path(...,min=1),
-                    session: AsyncSession = Depends(self._get_session)
+                    session: AsyncSession = Depends(self._writeSession)
                 ):
-                return await self.crud.delete(id, session)
+                res = await self.crud.delete(id, session)
+                return self._respond(res, self.crud_delete, request)
 
 
 class ExtendedRouter(SimpleRouter):
@@ -264,6 +439,7 @@ class ExtendedRouter(SimpleRouter):
     - create one
     - create many
     - read one
+    - read batch (by ids)
     - read many
     - update one
     - update many
@@ -277,7 +453,7 @@ class ExtendedRouter(SimpleRouter):
             prefix: str = "",
             tags: Optional[List[str]] = None,
             dependencies: Optional[Sequence[Depends]] = None,
-            default_response_class: Type[Response] = Default(JSONResponse),
+            default_response_class: Type[Response] = Default(FastJSONResponse),
             responses: Optional[Dict[Union[int, str], Dict[str, Any]]] = None,
             callbacks: Optional[List[BaseRoute]] = None,
             routes: Optional[List[BaseRoute]] = None,
@@ -292,13 +468,26 @@ class ExtendedRouter(SimpleRouter):
             create_one: Union[SimpleEndpoint, bool, None] = True,
             create_many: Union[SimpleEndpoint, bool, None] = True,
             read_one: Union[SimpleEndpoint, bool, None] = True,
+            read_batch: Union[SimpleEndpoint, bool, None] = True,
             read_many: Union[SimpleEndpoint, bool, None] = True,
             # read_many_like: Union[SimpleEndpoint, bool, None] = True,
             update_one: Union[SimpleEndpoint, bool, None] = True,
             update_many: Union[SimpleEndpoint, bool, None] = True,
             delete_one: Union[SimpleEndpoint, bool, None] = True,
             delete_many: Union[SimpleEndpoint, bool, None] = True,
-            disable_crud: bool = False
+            export: Union[SimpleEndpoint, bool, None] = True,
+            disable_crud: bool = False,
+            count_strategy: str = CountStrategy.exact,
+            delete_chunk_size: Optional[int] = None,
+            orm_delete: bool = False,
+            return_created: bool = False,
+            cache: Optional[CacheBackend] = None,
+            cache_ttl: float = 60,
+            metrics: Optional[Metrics] = None,
+            read_session_getter: Optional[FunctionType] = None,
+            read_your_writes: Optional[float] = None,
+            coalesce_window: Optional[float] = None,
+            singleflight: bool = False
         ):
         super().__init__(
                 classModel=classModel,
@@ -317,17 +506,30 @@ class ExtendedRouter(SimpleRouter):
                 on_shutdown=on_shutdown,
                 deprecated=deprecated,
                 include_in_schema=include_in_schema,
-                disable_crud=True)
+                disable_crud=True,
+                count_strategy=count_strategy,
+                delete_chunk_size=delete_chunk_size,
+                orm_delete=orm_delete,
+                return_created=return_created,
+                cache=cache,
+                cache_ttl=cache_ttl,
+                metrics=metrics,
+                read_session_getter=read_session_getter,
+                read_your_writes=read_your_writes,
+                coalesce_window=coalesce_window,
+                singleflight=singleflight)
    
         if disable_crud:
             create_one = None
             create_many = None
             read_one = None
+            read_batch = None
             read_many = None
             update_one = None
             update_many = None
             delete_one = None
             delete_many = None
+            export = None
 
         # create one
         if type(create_one) == SimpleEndpoint:
@@ -355,6 +557,15 @@ class ExtendedRouter(SimpleRouter):
                 self.read_one = SimpleEndpoint(path="/one", enable=True)
             else:
                 self.read_one = SimpleEndpoint(enable=False)
+
+        # read batch
+        if type(read_batch) == SimpleEndpoint:
+            self.read_batch = read_batch
+        else:
+            if read_batch:
+                self.read_batch = SimpleEndpoint(path="/batch", enable=True)
+            else:
+                self.read_batch = SimpleEndpoint(enable=False)
         
         # read many
         if type(read_many) == SimpleEndpoint:
@@ -409,29 +620,42 @@ class ExtendedRouter(SimpleRouter):
                 self.delete_many = SimpleEndpoint(path="", enable=True)
             else:
                 self.delete_many = SimpleEndpoint(enable=False)
+
+        # export
+        if type(export) == SimpleEndpoint:
+            self.export = export
+        else:
+            if export:
+                self.export = SimpleEndpoint(path="/export", enable=True)
+            else:
+                self.export = SimpleEndpoint(enable=False)
     
     def _setup_crud(self):
+        self.responseModels = get_response_models(self.classModel)
+        self._setup_metrics()
+        self._setup_sessions()
         if self.create_one.enable:
             kargs = self.create_one.get_endpoint_kwargs(
                 exclude_attributes=["enable","modelPydantic"]
                 )
             if not kargs["name"]:
                 kargs["name"] = "create one "+self.tablename
+            self._document_response(kargs, self.responseModels.one)
             if self.create_one.modelPydantic:
                 modelPydantic_ = self.create_one.modelPydantic
             else:
-                modelPydantic_ = generate_pydantic_model(
-                    classModel=self.classModel,
-                    modelName=self.tablename+"PydanticSimpleCreateOne"
-                )
+                modelPydantic_ = self.modelPydanticforCreate
                 self.create_one.modelPydantic = modelPydantic_
             @self.post(**kargs)
             async def base_post_one(
                     request: Request,
                     modelPydantic: modelPydantic_,
-                    session: AsyncSession = Depends(self._get_session)
+                    selectFields = Depends(CommonQuerySelectFields),
+                    session: AsyncSession = Depends(self._writeSession)
                 ):
-                return await self.crud.create(modelPydantic, session)
+                returning = self.returnCreated or bool(selectFields.fields)
+                res = await self.crud.create(modelPydantic, session, selectFields.fields, returning)
+                return self._respond(res, self.create_one, request)
 
         if self.create_many.enable:
             kargs = self.create_many.get_endpoint_kwargs(
@@ -444,27 +668,19 @@ class ExtendedRouter(SimpleRouter):
             else:
                 modelPydantic_ = create_model(
                     self.tablename+"PydanticSimpleCreateMany",
-                    **{self.tablename: (
-                        Optional[
-                            List[
-                                generate_pydantic_model(
-                                    classModel=self.classModel,
-                                    modelName=self.tablename+"PydanticSimpleCreateOneForMany"
-                                    )
-                                ]
-                            ],
-                        None
-                        )
-                    }
+                    **{self.tablename: (Optional[List[self.modelPydanticforCreate]], None)}
                 )
                 self.create_many.modelPydantic = modelPydantic_
             @self.post(**kargs)
             async def base_post_many(
                     request: Request,
                     modelPydantic: modelPydantic_,
-                    session: AsyncSession = Depends(self._get_session)
+                    selectFields = Depends(CommonQuerySelectFields),
+                    session: AsyncSession = Depends(self._writeSession)
                 ):
-                return await self.crud.create_many(modelPydantic, session)
+                returning = self.returnCreated or bool(selectFields.fields)
+                res = await self.crud.create_many(modelPydantic, session, selectFields.fields, returning)
+                return self._respond(res, self.create_many, request)
 
         if self.read_one.enable:
             kargs = self.read_one.get_endpoint_kwargs(
@@ -472,6 +688,7 @@ class ExtendedRouter(SimpleRouter):
                 )
             if not kargs["name"]:
                 kargs["name"] = "read one "+self.tablename
+            self._document_response(kargs, self.responseModels.one)
             if self.read_one.modelPydantic:
                 modelPydantic_ = self.read_one.modelPydantic
             else:
@@ -483,9 +700,30 @@ class ExtendedRouter(SimpleRouter):
             async def base_get_one(
                     request: Request,
                     modelPydantic_ = Depends(modelPydantic_),
-                    session: AsyncSession = Depends(self._get_session)
+                    selectFields = Depends(CommonQuerySelectFields),
+                    session: AsyncSession = Depends(self._readSession)
+                ):
+                res = await self.crud.read_one(
+                    modelPydantic_, session, selectFields.fields,
+                    encoded=self.read_one.response_model is None
+                )
+                return self._respond(res, self.read_one, request)
+
+        if self.read_batch.enable:
+            kargs = self.read_batch.get_endpoint_kwargs(
+                exclude_attributes=["enable","modelPydantic"]
+                )
+            if not kargs["name"]:
+                kargs["name"] = "read batch "+self.tablename
+            self._document_response(kargs, self.responseModels.batch)
+            @self.get(**kargs)
+            async def base_get_batch(
+                    request: Request,
+                    batchParams = Depends(CommonQueryBatch),
+                    session: AsyncSession = Depends(self._readSession)
                 ):
-                return await self.crud.read_one(modelPydantic_, session)
+                res = await self.crud.read_batch(batchParams.ids, session, batchParams.fields)
+                return self._respond(res, self.read_batch, request)
         
         if self.read_many.enable:
             kargs = self.read_many.get_endpoint_kwargs(
@@ -493,24 +731,63 @@ class ExtendedRouter(SimpleRouter):
                 )
             if not kargs["name"]:
                 kargs["name"] = "read many "+self.tablename
+            self._document_response(kargs, self.responseModels.many)
             if self.read_many.modelPydantic:
                 modelPydantic_ = self.read_many.modelPydantic
             else:
-                modelPydantic_ = generate_pydantic_model(
-                    classModel=self.classModel,
-                    modelName=self.tablename+"PydanticSimpleReadMany",
-                    uniform_attributes_paramsType=Query
-                )
+                modelPydantic_ = self.modelPydanticforQuery
                 self.read_many.modelPydantic = modelPydantic_
             @self.get(**kargs)
             async def base_get_many(
                     request: Request,
                     readParams = Depends(modelPydantic_),
                     getParams = Depends(CommonQueryGetter),
-                    session: AsyncSession = Depends(self._get_session)
+                    session: AsyncSession = Depends(self._readSession)
                 ):
                 wc = self.crud.where(**readParams.dict())
-                return await self.crud.read_many(getParams, session, wc)
+                res = await self.crud.read_many(
+                    getParams, session, wc, encoded=self.read_many.response_model is None
+                )
+                return self._respond(res, self.read_many, request)
+            self._setup_count(self.read_many, modelPydantic_)
+
+        if self.export.enable:
+            kargs = self.export.get_endpoint_kwargs(
+                exclude_attributes=["enable","modelPydantic"]
+                )
+            if not kargs["name"]:
+                kargs["name"] = "export "+self.tablename
+            if self.export.modelPydantic:
+                modelPydantic_ = self.export.modelPydantic
+            else:
+                modelPydantic_ = self.modelPydanticforQuery
+                self.export.modelPydantic = modelPydantic_
+            @self.get(**kargs)
+            async def base_get_export(
+                    request: Request,
+                    readParams = Depends(modelPydantic_),
+                    exportParams = Depends(CommonQueryExport),
+                    openSession = Depends(self._readSessionOpener)
+                ):
+                if exportParams.format not in ExportMediaTypes:
+                    return create_response(status=status.error(
+                        f"Invalid export format '{exportParams.format}', use one of {list(ExportMediaTypes)}"
+                    ))
+                wc = self.crud.where(**readParams.dict())
+                headers = None
+                if exportParams.format == ExportFormat.csv:
+                    headers = {"Content-Disposition": f'attachment; filename="{self.tablename}.csv"'}
+
+                async def stream():
+                    async with openSession() as session:
+                        async for chunk in self.crud.export(exportParams, session, wc):
+                            yield chunk
+
+                return StreamingResponse(
+                    stream(),
+                    media_type=ExportMediaTypes[exportParams.format],
+                    headers=headers
+                )
 
         # if self.read_paginate.enable:
         #     kargs = self.read_paginate.get_endpoint_kwargs(
@@ -532,14 +809,11 @@ class ExtendedRouter(SimpleRouter):
                 )
             if not kargs["name"]:
                 kargs["name"] = "update one "+self.tablename
+            self._document_response(kargs, self.responseModels.one)
             if self.update_one.modelPydantic:
                 modelPydantic_ = self.update_one.modelPydantic
             else:
-                premodelPydantic_ = generate_pydantic_model(
-                    classModel=self.classModel,
-                    modelName=self.tablename+"PydanticSimpleUpdateOne",
-                    exclude_attributes=["id"],
-                )
+                premodelPydantic_ = self.modelPydanticforUpdate
                 modelPydantic_ = create_model(
                     self.tablename+"PydanticSimpleUpdateOnePacked",
                     **{
@@ -552,9 +826,10 @@ class ExtendedRouter(SimpleRouter):
             async def base_put_one(
                     request: Request,
                     modelPydantic: modelPydantic_ = Depends(),
-                    session: AsyncSession = Depends(self._get_session)
+                    session: AsyncSession = Depends(self._writeSession)
                 ):
-                return await self.crud.update_one(modelPydantic, session)
+                res = await self.crud.update_one(modelPydantic, session)
+                return self._respond(res, self.update_one, request)
         
         if self.update_many.enable:
             kargs = self.update_many.get_endpoint_kwargs(
@@ -567,11 +842,7 @@ class ExtendedRouter(SimpleRouter):
             else:
                 modelPydantic_ = create_model(
                     self.tablename+"PydanticSimpleUpdateMany",
-                    **{self.tablename: (Optional[List[
-                        generate_pydantic_model(
-                            classModel=self.classModel,
-                            modelName=self.tablename+"PydanticSimpleUpdateOneWithID"
-                        )]], None)}
+                    **{self.tablename: (Optional[List[self.modelPydanticforCreate]], None)}
                 )
                 self.update_many.modelPydantic = modelPydantic_
             @self.put(**kargs)
@@ -582,9 +853,10 @@ class ExtendedRouter(SimpleRouter):
                         ...,
                         description="Put your reference key that will be used to refer your data and won't be updated"
                         ),
-                    session: AsyncSession = Depends(self._get_session)
+                    session: AsyncSession = Depends(self._writeSession)
                 ):
-                return await self.crud.update_many(reference_key, pydanticModelCollection, session)
+                res = await self.crud.update_many(pydanticModelCollection, reference_key, session)
+                return self._respond(res, self.update_many, request)
 
         if self.delete_one.enable:
             kargs = self.delete_one.get_endpoint_kwargs(
@@ -596,9 +868,10 @@ class ExtendedRouter(SimpleRouter):
             async def base_delete_one(
                     request: Request,
                     id: int = Path(...,min=1),
-                    session: AsyncSession = Depends(self._get_session)
+                    session: AsyncSession = Depends(self._writeSession)
                 ):
-                return await self.crud.delete(id, session)
+                res = await self.crud.delete(id, session)
+                return self._respond(res, self.delete_one, request)
         
         if self.delete_many.enable:
             kargs = self.delete_many.get_endpoint_kwargs(
@@ -609,19 +882,16 @@ class ExtendedRouter(SimpleRouter):
             if self.delete_many.modelPydantic:
                 modelPydantic_ = self.delete_many.modelPydantic
             else:
-                modelPydantic_ = generate_pydantic_model(
-                    classModel=self.classModel,
-                    modelName=self.tablename+"PydanticSimpleDeleteMany",
-                    uniform_attributes_paramsType=Query
-                )
+                modelPydantic_ = self.modelPydanticforQuery
                 self.delete_many.modelPydantic = modelPydantic_
             @self.delete(**kargs)
             async def base_delete_many(
                     request: Request,
                     deleteParams = Depends(modelPydantic_),
-                    session: AsyncSession = Depends(self._get_session)
+                    session: AsyncSession = Depends(self._writeSession)
                 ):
-                return await self.crud.delete_many(deleteParams, session)
+                res = await self.crud.delete_many(deleteParams, session)
+                return self._respond(res, self.delete_many, request)
 
 
 RouterClasses = [SimpleRouter, ExtendedRouter]
@@ -4,17 +4,21 @@ from fastapi.routing import APIRoute
 from fastapi.datastructures import Default
 from pydantic import BaseConfig, BaseModel, create_model
 from pydantic.fields import ModelField
-from starlette.routing import BaseRoute
+from starlette.routing import BaseRoute, Match, NoMatchFound
 from starlette.responses import Response, JSONResponse
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Receive, Scope, Send
 from typing import Optional, List, Sequence, Type, Any, Callable, Union, Dict
 from sqlalchemy.orm import decl_api
 from sqlalchemy.ext.asyncio import AsyncSession
 from types import FunctionType
 from datetime import datetime
+import threading
 
 from .dependencies.utils import BaseCRUD
 from .dependencies.utility import CommonQueryGetter
+from .dependencies.metrics import Metrics, PROMETHEUS_MEDIA_TYPE
+from .dependencies.statements import SQLCountMiddleware
+from .openapi import OpenAPICache
 
 from .routing import *
 
@@ -49,7 +53,8 @@ class RouterMap():
     def create_router_map_from_base(
             base: decl_api.DeclarativeMeta,
             base_prefix: str = "",
-            extend: bool = False
+            extend: bool = False,
+            router_kwargs: Optional[Dict[str, Any]] = None
         ):
         """
         Create All CRUD Automatically from SQLAlchemy declared base
@@ -58,14 +63,16 @@ class RouterMap():
         - base -> SQLAlchemy declarative base
         - base_prefix -> Base prefix path for all endpoints in one router
         - extend -> Applying ExtendedRouter for more API
+        - router_kwargs -> Additional keyword arguments for every router (ex: count_strategy)
         """
         class AutoMap(RouterMap): pass
         targetRouter = ExtendedRouter if extend else SimpleRouter 
+        if not router_kwargs: router_kwargs = {}
         for c in base.__subclasses__():
             setattr(
                 AutoMap,
                 c.__tablename__,                
-                targetRouter(c, prefix=base_prefix+"/"+c.__tablename__, tags=[c.__tablename__])
+                targetRouter(c, prefix=base_prefix+"/"+c.__tablename__, tags=[c.__tablename__], **router_kwargs)
                 )
         return AutoMap
     
@@ -84,7 +91,11 @@ class RouterMap():
     def generate(
             cls,
             application: Optional[FastAPI] = None,
-            session_getter: Optional[FunctionType] = None
+            session_getter: Optional[FunctionType] = None,
+            lazy: bool = False,
+            metrics: Optional[Metrics] = None,
+            read_session_getter: Optional[FunctionType] = None,
+            read_your_writes: Optional[float] = None
         ):
         """
         Generate routers that have been defined using RouterMap
@@ -92,13 +103,52 @@ class RouterMap():
         :params
         - application -> FastAPI Application
         - session_getter -> SQLAlchemy AsyncSession Getter/yielder
+        - lazy -> set up every router on its first request (or on the first OpenAPI render)
+        - metrics -> phase timers and counters of every router (unless it has its own)
+        - read_session_getter -> AsyncSession Getter/yielder of the reads (ex: replicas),
+        unless a router has its own
+        - read_your_writes -> seconds a client reads from session_getter after its writes
         """
         if cls == RouterMap:
-            return SimpleCRUDGenerator(application, session_getter, True)
+            return SimpleCRUDGenerator(
+                application, session_getter, True, lazy, metrics, read_session_getter, read_your_writes
+            )
         e = "RouterMap.generate() only able to be called from 'RouterMap' class"
         raise BaseException(e)
 
 
+class LazyRouterRoute(BaseRoute):
+    """
+    Placeholder of a generated router, it matches every path under the router prefix.
+    On its first request the router is set up and its routes take the place
+    of the placeholder, then the request is routed again.
+    """
+    lazyPlaceholder = True
+
+    def __init__(self, generator: "SimpleCRUDGenerator", router: SimpleRouterType):
+        self.generator = generator
+        self.router = router
+        self.path = router.prefix
+        self.name = router.tablename
+
+    def matches(self, scope: Scope):
+        if scope["type"] == "http":
+            path = scope["path"]
+            if path == self.path or path.startswith(self.path + "/"):
+                return Match.FULL, {}
+        return Match.NONE, {}
+
+    def url_path_for(self, name: str, **path_params: Any):
+        raise NoMatchFound(name, path_params)
+
+    def materialize(self):
+        self.generator.materialize(self.router)
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
+        self.materialize()
+        await self.generator.app.router(scope, receive, send)
+
+
 class SimpleCRUDGenerator():
     """
     Create CRUD Operation in a simple way.
@@ -107,16 +157,31 @@ class SimpleCRUDGenerator():
     - application -> FastAPI Application
     - session_getter -> method to get the sqlalchemy session
     - autogenerate (bool) -> once instantiated, the base crud endpoints will be created
+    - lazy (bool) -> set up every router on its first request (or on the first OpenAPI render)
+    - metrics -> phase timers and counters of every router (unless it has its own)
+    - read_session_getter -> method to get the sqlalchemy session of the reads (ex: replicas),
+    unless a router has its own
+    - read_your_writes -> seconds a client reads from session_getter after its writes
     """
     def __init__(
             self,
             application: Optional[FastAPI] = None,
             session_getter: Optional[FunctionType] = None, 
-            autogenerate: bool = True
+            autogenerate: bool = True,
+            lazy: bool = False,
+            metrics: Optional[Metrics] = None,
+            read_session_getter: Optional[FunctionType] = None,
+            read_your_writes: Optional[float] = None
         ):
         self.app = application
         self.allRouters = RouterMap._collect_simple_router()
         self.session_getter = session_getter
+        self.read_session_getter = read_session_getter
+        self.read_your_writes = read_your_writes
+        self.lazy = lazy
+        self.metrics = metrics
+        self.lazyRoutes: Dict[str, LazyRouterRoute] = {}
+        self._lazyLock = threading.RLock()
         if not all([application, session_getter]): autogenerate = False
         if autogenerate: self.generate_router()
     
@@ -132,6 +197,17 @@ class SimpleCRUDGenerator():
         """
         self.session_getter = session_getter
 
+    def set_read_session_getter(
+            self,
+            read_session_getter: FunctionType,
+            read_your_writes: Optional[float] = None
+        ):
+        """
+        Set your session getter for the reads (ex: replicas), the writes keep the session getter
+        """
+        self.read_session_getter = read_session_getter
+        self.read_your_writes = read_your_writes
+
     def update_map(self, router: SimpleRouterType):
         """
         Add your fastapi_simple_crud.SimpleRouter() or fastapi_simple_crud.ExtendedRouter() 
@@ -153,5 +229,115 @@ class SimpleCRUDGenerator():
             for tag in sorted(self.allRouters):
                 router = self.allRouters[tag]
                 router.set_the_get_session(self.session_getter)
-                router._setup_crud()
-                self.app.include_router(router)
\ No newline at end of file
+                if self.read_session_getter and router._get_read_session is None:
+                    router.set_the_get_read_session(
+                        self.read_session_getter,
+                        None if router.readYourWrites else self.read_your_writes
+                    )
+                if self.metrics is not None and router.crud.metrics is None:
+                    router.set_metrics(self.metrics)
+                if self.lazy:
+                    self.lazyRoutes[tag] = LazyRouterRoute(self, router)
+                    self.app.router.routes.append(self.lazyRoutes[tag])
+                else:
+                    router._setup_crud()
+                    self.app.include_router(router)
+            if self.lazy:
+                self._wrap_openapi()
+
+    def mount_metrics(self, path: str = "/metrics", metrics: Optional[Metrics] = None):
+        """
+        Expose the metrics in Prometheus text format
+
+        :params:
+        - path -> path of the endpoint (not in the OpenAPI schema)
+        - metrics -> metrics to expose, the generator ones by default
+        """
+        metrics = metrics or self.metrics
+        if metrics is None:
+            raise ValueError("No metrics to mount, generate the routers with 'metrics=Metrics()'")
+        async def metrics_endpoint(request: Request):
+            return Response(metrics.render(), media_type=PROMETHEUS_MEDIA_TYPE)
+        self.app.add_route(path, metrics_endpoint, include_in_schema=False)
+
+    def count_sql_statements(
+            self,
+            engine,
+            budget: Optional[int] = None,
+            raise_on_exceed: bool = False,
+            headers: bool = True
+        ):
+        """
+        Count the SQL statements and their time per request, in the 'X-SQL-Count'
+        and 'X-SQL-Time' response headers. Call it before the application starts.
+
+        :params:
+        - engine -> SQLAlchemy (async) engine of the session getter
+        - budget -> default maximum statements of a request, 'SimpleEndpoint(sql_budget=...)'
+        replaces it for an endpoint
+        - raise_on_exceed -> raise SQLBudgetExceeded (500) instead of logging a warning
+        - headers -> add the response headers
+        """
+        self.app.add_middleware(
+            SQLCountMiddleware,
+            engine=engine,
+            budget=budget,
+            raise_on_exceed=raise_on_exceed,
+            headers=headers
+        )
+
+    def materialize(self, router: SimpleRouterType):
+        """
+        set up a lazy router, its routes replace its placeholder in the application.
+        The OpenAPI schema can be built in a thread, the lock keeps a router from
+        being routed to before its routes are in place
+        """
+        with self._lazyLock:
+            placeholder = self.lazyRoutes.pop(router.tablename, None)
+            if placeholder is None:
+                return
+            routes = self.app.router.routes
+            count = len(routes)
+            router._setup_crud()
+            self.app.include_router(router)
+            included = routes[count:]
+            del routes[count:]
+            index = routes.index(placeholder)
+            routes[index:index + 1] = included
+
+    def materialize_all(self):
+        with self._lazyLock:
+            for tag in sorted(self.lazyRoutes):
+                placeholder = self.lazyRoutes.get(tag)
+                if placeholder is not None:
+                    self.materialize(placeholder.router)
+
+    def _wrap_openapi(self):
+        """
+        the OpenAPI schema needs every route, the lazy routers are set up before it
+        """
+        openapi = self.app.openapi
+        if getattr(openapi, "materializeRouters", False):
+            return
+        generator = self
+        def lazy_openapi():
+            generator.materialize_all()
+            return openapi()
+        lazy_openapi.materializeRouters = True
+        self.app.openapi = lazy_openapi
+
+    def cache_openapi(
+            self,
+            base: Optional[decl_api.DeclarativeMeta] = None,
+            directory: Optional[str] = None,
+            warmup: bool = True
+        ) -> OpenAPICache:
+        """
+        Serve the OpenAPI schema from a cache, it is built once (in a thread on startup)
+
+        :params:
+        - base -> SQLAlchemy declarative base, its tables are part of the file fingerprint
+        - directory -> directory where the schema is persisted, keyed by its fingerprint
+        - warmup -> build the schema in a thread on startup
+        """
+        return OpenAPICache(self.app, base, directory, warmup)
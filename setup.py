@@ -21,6 +21,10 @@ setup(
     long_description=long_description,
     packages=find_packages(),
     install_requires=["uvicorn","fastapi","sqlalchemy","pydantic"],
+    extras_require={"orjson": ["orjson"]},
+    entry_points={
+        "console_scripts": ["fastapi-simple-crud=fastapi_simple_crud.codegen:main"]
+    },
     keywords=['fastapi', 'crud', 'restful', 'routing', "router", 'generator','aiosqlite'],
     classifiers=[
         "Development Status :: 3 - Alpha",
@@ -0,0 +1,465 @@
+import asyncio
+import enum
+import json
+import uuid
+from datetime import datetime, time
+from typing import List, Optional
+
+from fastapi import Query
+from pydantic import create_model
+from sqlalchemy import Column, Integer, String, Time, Uuid, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from fastapi_simple_crud.dependencies.utils import (
+    BaseCRUD, QueryPaginator, Selector, encode_csv, generate_pydantic_model, set_declarative_base
+)
+from fastapi_simple_crud.dependencies.cache import MemoryCacheBackend
+from fastapi_simple_crud.dependencies.serializer import RowSerializer
+from fastapi_simple_crud.dependencies.utility import CommonQueryGetter
+
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "item"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(50), nullable=False)
+    tenant_id = Column(Integer)
+    score = Column(Integer, index=True)
+
+
+class Token(Base):
+    __tablename__ = "token"
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    at = Column(Time, nullable=False)
+
+
+def run(test):
+    """
+    run the coroutine 'test(session)' on a fresh in memory database
+    """
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        try:
+            async with Session() as session:
+                return await test(session)
+        finally:
+            await engine.dispose()
+    return asyncio.run(main())
+
+
+def query_params(**params) -> CommonQueryGetter:
+    defaults = dict(fields=None, page=1, limit=20, sortBy="id", sortType="asc", cursor=None, countStrategy=None)
+    defaults.update(params)
+    return CommonQueryGetter(**defaults)
+
+
+async def seed(session: AsyncSession, rows: list):
+    session.add_all([Item(**row) for row in rows])
+    await session.commit()
+
+
+def test_cursor_pages_nullable_sort_column():
+    rows = [
+        {"name": f"n{i}", "score": None if i % 3 == 0 else i % 5}
+        for i in range(20)
+    ]
+
+    async def test(session):
+        await seed(session, rows)
+        crud = BaseCRUD(Item)
+        for sortType in ["asc", "desc"]:
+            seen = []
+            cursor = ""
+            while True:
+                res = await crud.read_many(
+                    query_params(sortBy="score", sortType=sortType, limit=3, cursor=cursor),
+                    session
+                )
+                assert res["status"]["code"] == 0
+                seen += [r["id"] for r in res["data"]["list"]]
+                cursor = res["meta"]["next_cursor"]
+                if not cursor:
+                    break
+            offset = await crud.read_many(
+                query_params(sortBy="score", sortType=sortType, limit=20), session
+            )
+            assert sorted(seen) == list(range(1, 21))
+            assert seen == [r["id"] for r in offset["data"]["list"]]
+
+    run(test)
+
+
+def test_cursor_pages_are_served_by_the_sort_column_index():
+    rows = [
+        {"name": f"n{i}", "score": None if i % 3 == 0 else i % 5}
+        for i in range(20)
+    ]
+
+    async def test(session):
+        await seed(session, rows)
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("SELECT item.id"):
+                statements.append((statement, parameters))
+
+        event.listen(session.bind.sync_engine, "before_cursor_execute", capture)
+        crud = BaseCRUD(Item)
+        for sortType in ["asc", "desc"]:
+            cursor = ""
+            while True:
+                res = await crud.read_many(
+                    query_params(sortBy="score", sortType=sortType, limit=3, cursor=cursor),
+                    session
+                )
+                cursor = res["meta"]["next_cursor"]
+                if not cursor:
+                    break
+        event.remove(session.bind.sync_engine, "before_cursor_execute", capture)
+        assert statements
+        connection = await session.connection()
+        for statement, parameters in statements:
+            plan = await connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+            details = " ".join(str(r[-1]) for r in plan.all())
+            assert "TEMP B-TREE" not in details, (statement, details)
+            assert "ix_item_score" in details, (statement, details)
+
+    run(test)
+
+
+def test_unknown_fields_select_all_fields():
+    async def test(session):
+        await seed(session, [{"name": "a", "tenant_id": 1, "score": 5}])
+        crud = BaseCRUD(Item)
+        ReadOne = create_model("ItemReadOneTest", id=(int, ...))
+        expected = {"id": 1, "name": "a", "tenant_id": 1, "score": 5}
+        res = await crud.read_one(ReadOne(id=1), session, "bogus")
+        assert res["status"]["code"] == 0
+        assert res["data"] == expected
+        res = await crud.read_one(ReadOne(id=1), session, "bogus,name")
+        assert res["data"] == {"name": "a"}
+        res = await crud.read_many(query_params(fields="bogus"), session)
+        assert res["status"]["code"] == 0
+        assert res["data"]["list"] == [expected]
+
+    run(test)
+
+
+def test_update_one_keeps_the_conditions_beside_the_primary_key():
+    ItemValues = create_model("ItemUpdateValuesTest", name=(Optional[str], None))
+    UpdateOne = create_model(
+        "ItemUpdateOneTest", id=(int, ...), tenant_id=(int, ...), item=(ItemValues, ...)
+    )
+
+    async def test(session):
+        await seed(session, [{"name": "a", "tenant_id": 1}, {"name": "b", "tenant_id": 2}])
+        crud = BaseCRUD(Item)
+        res = await crud.update_one(
+            UpdateOne(id=2, tenant_id=1, item=ItemValues(name="x")), session
+        )
+        assert res["status"]["code"] == 22
+        res = await crud.read_one(create_model("ItemIdTest", id=(int, ...))(id=2), session)
+        assert res["data"]["name"] == "b"
+        res = await crud.update_one(
+            UpdateOne(id=2, tenant_id=2, item=ItemValues(name="x")), session
+        )
+        assert res["status"]["code"] == 0
+        assert res["data"] == {"id": 2, "name": "x", "tenant_id": 2, "score": None}
+
+    run(test)
+
+
+def test_create_returns_the_rows_in_order_with_unknown_fields():
+    ItemCreate = create_model(
+        "ItemCreateTest", name=(str, ...), tenant_id=(Optional[int], None), score=(Optional[int], None)
+    )
+    ItemCreateMany = create_model("ItemCreateManyTest", item=(List[ItemCreate], ...))
+
+    async def test(session):
+        crud = BaseCRUD(Item)
+        res = await crud.create(ItemCreate(name="a"), session, "bogus", True)
+        assert res["status"]["code"] == 0
+        assert res["data"] == {"id": 1, "name": "a", "tenant_id": None, "score": None}
+        items = [ItemCreate(name=f"n{i}", score=i) for i in range(10)]
+        items += [ItemCreate(name=f"m{i}", tenant_id=i) for i in range(10)]
+        res = await crud.create_many(ItemCreateMany(item=items), session, "name", True)
+        assert res["status"]["code"] == 0
+        assert res["data"]["list"] == [{"name": i.name} for i in items]
+
+    run(test)
+
+
+def test_generate_pydantic_model_is_memoized():
+    a = generate_pydantic_model(Item, "ItemQueryTest", uniform_attributes_paramsType=Query)
+    b = generate_pydantic_model(Item, "ItemQueryTest", uniform_attributes_paramsType=Query)
+    assert a is b
+    assert generate_pydantic_model(Item, "ItemCreateTest2", exclude_attributes=["id"]) is \
+        generate_pydantic_model(Item, "ItemCreateTest2", exclude_attributes=[Item.id])
+    assert generate_pydantic_model(Item, "ItemQueryTest") is not a
+
+
+async def closed_session_execute(*args, **kwargs):
+    raise RuntimeError("the session of a cancelled request is closed")
+
+
+def test_coalesced_read_survives_the_cancelled_first_read():
+    ReadOne = create_model("ItemCoalesceTest", id=(int, ...))
+
+    async def test(session):
+        await seed(session, [{"name": "a"}, {"name": "b"}])
+        crud = BaseCRUD(Item, coalesce_window=0.01)
+        leaderSession = type(session)(session.bind)
+        leader = asyncio.ensure_future(crud.read_one(ReadOne(id=1), leaderSession))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(crud.read_one(ReadOne(id=2), session))
+        await asyncio.sleep(0)
+        leader.cancel()
+        leaderSession.execute = closed_session_execute
+        res = await follower
+        assert res["status"]["code"] == 0
+        assert res["data"] == {"id": 2, "name": "b", "tenant_id": None, "score": None}
+
+    run(test)
+
+
+def test_singleflight_read_survives_the_cancelled_first_read():
+    async def test(session):
+        await seed(session, [{"name": "a"}])
+        crud = BaseCRUD(Item, singleflight=True)
+        leaderSession = type(session)(session.bind)
+        leader = asyncio.ensure_future(crud.read_many(query_params(), leaderSession))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(crud.read_many(query_params(), session))
+        await asyncio.sleep(0)
+        assert len(crud.singleFlight) == 1
+        leader.cancel()
+        leaderSession.execute = closed_session_execute
+        res = await follower
+        assert res["status"]["code"] == 0
+        assert res["data"]["list"] == [{"id": 1, "name": "a", "tenant_id": None, "score": None}]
+
+    run(test)
+
+
+def test_singleflight_shares_only_the_same_session_configuration():
+    async def test(session):
+        await seed(session, [{"name": "a"}])
+        crud = BaseCRUD(Item, singleflight=True)
+        sessions = [
+            type(session)(session.bind, info={"tenant": 1}),
+            type(session)(session.bind, info={"tenant": 2}),
+            type(session)(session.bind, info={"tenant": 2}),
+        ]
+        reads = [
+            asyncio.ensure_future(crud.read_many(query_params(), s)) for s in sessions
+        ]
+        await asyncio.sleep(0)
+        assert len(crud.singleFlight) == 2
+        await asyncio.gather(*reads)
+        await session.connection()
+        read = asyncio.ensure_future(crud.read_many(query_params(), session))
+        await asyncio.sleep(0)
+        assert len(crud.singleFlight) == 0
+        res = await read
+        assert res["data"]["list"] == [{"id": 1, "name": "a", "tenant_id": None, "score": None}]
+        for s in sessions:
+            await s.close()
+
+    run(test)
+
+
+def test_cursor_of_uuid_primary_key_and_time_column():
+    async def test(session):
+        session.add_all([Token(at=time(i % 3, 30)) for i in range(5)])
+        await session.commit()
+        crud = BaseCRUD(Token)
+        res = await crud.read_many(query_params(limit=2), session)
+        assert res["status"]["code"] == 0
+        assert res["meta"]["next_cursor"] is None
+        assert len(res["data"]["list"]) == 2
+        for sortBy in ["id", "at"]:
+            offset = await crud.read_many(query_params(sortBy=sortBy), session)
+            seen = []
+            cursor = ""
+            while True:
+                res = await crud.read_many(query_params(sortBy=sortBy, limit=2, cursor=cursor), session)
+                assert res["status"]["code"] == 0
+                seen += res["data"]["list"]
+                cursor = res["meta"]["next_cursor"]
+                if not cursor:
+                    break
+            assert seen == offset["data"]["list"]
+            assert len(seen) == 5
+
+    run(test)
+
+
+def test_selector_cursor_needs_a_primary_key():
+    set_declarative_base(Base)
+
+    async def test(session):
+        await seed(session, [{"name": "a", "score": 1}, {"name": "b", "score": 1}])
+        paginator = QueryPaginator(
+            query_params(sortBy="score", limit=1, cursor=""),
+            Selector(name=Item.name, score=Item.score)
+        )
+        try:
+            await paginator.execute_pagination(session, paginator.rawQuery)
+            assert False, "cursor without a primary key"
+        except ValueError:
+            pass
+        seen = []
+        cursor = ""
+        while cursor is not None:
+            paginator = QueryPaginator(
+                query_params(sortBy="score", limit=1, cursor=cursor),
+                Selector(id=Item.id, name=Item.name, score=Item.score)
+            )
+            res = await paginator.execute_pagination(session, paginator.rawQuery)
+            seen += [r["name"] for r in res["data"]["list"]]
+            cursor = res["meta"]["next_cursor"]
+        assert seen == ["a", "b"]
+
+    run(test)
+
+
+def test_update_many_writes_only_the_given_fields():
+    ItemUpdate = create_model(
+        "ItemUpdateManyRowTest",
+        id=(Optional[int], None),
+        name=(Optional[str], None),
+        tenant_id=(Optional[int], None),
+        score=(Optional[int], None),
+    )
+    ItemUpdateMany = create_model("ItemUpdateManyTest", item=(List[ItemUpdate], ...))
+
+    async def test(session):
+        await seed(session, [
+            {"name": "a", "tenant_id": 1, "score": 1},
+            {"name": "b", "tenant_id": 2, "score": 2},
+            {"name": "c", "tenant_id": 3, "score": 3},
+        ])
+        crud = BaseCRUD(Item)
+        res = await crud.update_many(
+            ItemUpdateMany(item=[
+                ItemUpdate(name="a", score=10),
+                ItemUpdate(id=9, name="b", tenant_id=20),
+                ItemUpdate(name="c"),
+                ItemUpdate(name="z", score=0),
+            ]),
+            "name",
+            session
+        )
+        assert res["status"]["code"] == 0
+        assert res["data"]["matched"] == ["a", "b", "c"]
+        assert res["data"]["unmatched"] == ["z"]
+        res = await crud.read_many(query_params(), session)
+        assert res["data"]["list"] == [
+            {"id": 1, "name": "a", "tenant_id": 1, "score": 10},
+            {"id": 2, "name": "b", "tenant_id": 20, "score": 2},
+            {"id": 3, "name": "c", "tenant_id": 3, "score": 3},
+        ]
+
+    run(test)
+
+
+def test_estimated_count_probe_runs_in_a_savepoint():
+    async def test(session):
+        await seed(session, [{"name": f"n{i}"} for i in range(5)])
+        crud = BaseCRUD(Item)
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(session.bind.sync_engine, "before_cursor_execute", capture)
+        res = await crud.read_many(query_params(countStrategy="estimated"), session)
+        event.remove(session.bind.sync_engine, "before_cursor_execute", capture)
+        assert res["status"]["code"] == 0
+        assert res["meta"]["total"] == 5
+        assert any(s.startswith("SAVEPOINT") for s in statements)
+        assert any(s.startswith("ROLLBACK TO SAVEPOINT") for s in statements)
+        res = await crud.read_many(query_params(), session)
+        assert res["meta"]["total"] == 5
+
+    run(test)
+
+
+def test_common_query_getter_has_plain_defaults():
+    getParams = CommonQueryGetter(limit=5)
+    assert getParams.cursor is None
+    assert getParams.countStrategy is None
+    assert (getParams.page, getParams.sortBy, getParams.sortType) == (1, "id", "asc")
+
+
+def test_csv_export_writes_values_as_the_json_exports():
+    class Color(enum.Enum):
+        red = "r"
+
+    rows = [[1, Color.red, datetime(2024, 1, 2, 3, 4, 5), None]]
+    assert encode_csv(["id", "color", "at", "score"], rows, header=True).decode().splitlines() == [
+        "id,color,at,score", "1,r,2024-01-02T03:04:05,"
+    ]
+
+
+def test_cached_reads_return_the_response_envelope():
+    ReadOne = create_model("ItemCachedReadTest", id=(int, ...))
+
+    async def test(session):
+        await seed(session, [{"name": "a"}])
+        crud = BaseCRUD(Item, cache=MemoryCacheBackend())
+        expected = {"id": 1, "name": "a", "tenant_id": None, "score": None}
+        for _ in range(2):
+            res = await crud.read_one(ReadOne(id=1), session)
+            assert res["data"] == expected
+            res = await crud.read_many(query_params(), session)
+            assert res["data"]["list"] == [expected]
+        body = await crud.read_many(query_params(), session, encoded=True)
+        assert json.loads(body) == res
+
+    run(test)
+
+
+def test_row_serializer_keeps_the_recently_used_fields():
+    serializer = RowSerializer(Item)
+    serializer.maxsize = 2
+    first = serializer.compile(["id"])
+    serializer.compile(["name"])
+    assert serializer.compile(["id"]) is first
+    serializer.compile(["score"])
+    assert serializer.compile(["id"]) is first
+    assert list(serializer._compiled) == [("score",), ("id",)]
+
+
+def test_window_count_in_a_single_round_trip():
+    async def test(session):
+        await seed(session, [{"name": f"n{i}", "score": i % 2} for i in range(5)])
+        crud = BaseCRUD(Item)
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(session.bind.sync_engine, "before_cursor_execute", capture)
+        res = await crud.read_many(query_params(limit=2, countStrategy="window"), session)
+        assert [r["id"] for r in res["data"]["list"]] == [1, 2]
+        assert res["meta"]["total"] == 5
+        assert len(statements) == 1 and "over" in statements[0].lower()
+        res = await crud.read_many(
+            query_params(limit=2, countStrategy="window"), session, crud.where(score=1)
+        )
+        assert res["meta"]["total"] == 2
+        statements.clear()
+        res = await crud.read_many(query_params(page=9, limit=2, countStrategy="window"), session)
+        event.remove(session.bind.sync_engine, "before_cursor_execute", capture)
+        assert res["data"]["list"] == []
+        assert res["meta"]["total"] == 5
+        assert len(statements) == 2
+
+    run(test)
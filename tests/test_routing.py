@@ -0,0 +1,352 @@
+import asyncio
+import json
+import os
+import tempfile
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import Column, Integer, String, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from fastapi_simple_crud.dependencies.cache import MemoryCacheBackend
+from fastapi_simple_crud.dependencies.metrics import Metrics
+from fastapi_simple_crud.routing import ExtendedRouter, SimpleEndpoint
+from fastapi_simple_crud.simpleCRUD import SimpleCRUDGenerator
+
+
+Base = declarative_base()
+
+
+class Note(Base):
+    __tablename__ = "note"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    text = Column(String(50), nullable=False)
+
+
+def serve(routers, test, notes=("a", "b", "c"), **options):
+    """
+    run the coroutine 'test(client, generator, engine)' against an application
+    generating 'routers', on a fresh in memory database holding the 'notes'
+    """
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+            if notes:
+                await connection.execute(Note.__table__.insert(), [{"text": t} for t in notes])
+        Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async def get_session():
+            async with Session() as session:
+                yield session
+
+        app = FastAPI()
+        generator = SimpleCRUDGenerator(app, get_session, autogenerate=False, **options)
+        for router in routers:
+            generator.update_map(router)
+        generator.generate_router()
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await test(client, generator, engine)
+        finally:
+            await engine.dispose()
+    return asyncio.run(main())
+
+
+def test_read_your_writes_with_result_cache():
+    """
+    the replica lags behind the primary, a pinned client reads the primary
+    without being served what the replica reads cached
+    """
+    async def main(directory):
+        engines = {
+            name: create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, name)}.db")
+            for name in ["primary", "replica"]
+        }
+        for engine in engines.values():
+            async with engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+                await connection.execute(Note.__table__.insert().values(text="orig"))
+        sessions = {
+            name: sessionmaker(engine, class_=AsyncSession) for name, engine in engines.items()
+        }
+        opened = []
+
+        async def get_session():
+            opened.append("primary")
+            async with sessions["primary"]() as session:
+                yield session
+
+        async def get_replica_session():
+            opened.append("replica")
+            async with sessions["replica"]() as session:
+                yield session
+
+        app = FastAPI()
+        generator = SimpleCRUDGenerator(
+            app, get_session, autogenerate=False,
+            read_session_getter=get_replica_session, read_your_writes=5
+        )
+        generator.update_map(ExtendedRouter(Note, cache=MemoryCacheBackend()))
+        generator.generate_router()
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                res = await client.get("/note/one", params={"id": 1})
+                assert res.json()["data"]["text"] == "orig"
+                assert opened == ["replica"]
+                res = await client.put("/note/1", json={"text": "new"})
+                assert res.json()["data"]["text"] == "new"
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as other:
+                    res = await other.get("/note/one", params={"id": 1})
+                    assert res.json()["data"]["text"] == "orig"
+                opened.clear()
+                res = await client.get("/note/one", params={"id": 1})
+                assert res.json()["data"]["text"] == "new"
+                assert opened == ["primary"]
+        finally:
+            for engine in engines.values():
+                await engine.dispose()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(main(directory))
+
+
+def test_lazy_openapi_schema_is_persisted():
+    async def get_session():
+        yield None
+
+    def build_app():
+        app = FastAPI()
+        generator = SimpleCRUDGenerator(app, get_session, autogenerate=False, lazy=True)
+        generator.update_map(ExtendedRouter(Note))
+        generator.generate_router()
+        return app, generator
+
+    async def main(directory):
+        app, generator = build_app()
+        generator.cache_openapi(directory=directory, warmup=False)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            res = await client.get("/openapi.json")
+        assert "/note/one" in res.json()["paths"]
+        files = os.listdir(directory)
+        assert len(files) == 1 and files[0].startswith("openapi-")
+        app, generator = build_app()
+        cache = generator.cache_openapi(directory=directory, warmup=False)
+        assert cache.build() == res.content
+        assert os.listdir(directory) == files
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(main(directory))
+
+
+def test_export_streams_every_row_on_its_own_session():
+    async def main(directory):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, 'db')}.db")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+            await connection.execute(
+                Note.__table__.insert(), [{"text": f"n{i}"} for i in range(250)]
+            )
+        Session = sessionmaker(engine, class_=AsyncSession)
+        events = []
+
+        async def get_session():
+            async with Session() as session:
+                events.append("open")
+                yield session
+            events.append("close")
+
+        app = FastAPI()
+        generator = SimpleCRUDGenerator(app, get_session, autogenerate=False)
+        generator.update_map(ExtendedRouter(Note))
+        generator.generate_router()
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                res = await client.get("/note/export", params={"format": "ndjson"})
+                lines = [json.loads(line) for line in res.text.splitlines()]
+                assert [line["id"] for line in lines] == list(range(1, 251))
+                res = await client.get("/note/export", params={"format": "csv", "fields": "id"})
+                assert res.text.split() == ["id"] + [str(i) for i in range(1, 251)]
+            assert events == ["open", "close"] * 2
+        finally:
+            await engine.dispose()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(main(directory))
+
+
+def test_head_counts_the_filtered_rows():
+    async def test(client, generator, engine):
+        res = await client.head("/note")
+        assert res.status_code == 200
+        assert res.headers["X-Total-Count"] == "3"
+        assert res.content == b""
+        res = await client.head("/note", params={"text": "b"})
+        assert res.headers["X-Total-Count"] == "1"
+
+    serve([ExtendedRouter(Note)], test)
+
+
+def test_delete_one_and_many_with_a_statement():
+    async def test(client, generator, engine):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split()[0])
+
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        res = await client.delete("/note/1")
+        assert res.json()["status"]["code"] == 0
+        assert statements == ["DELETE"]
+        res = await client.delete("/note/1")
+        assert res.json()["status"]["code"] == 4
+        statements.clear()
+        res = await client.delete("/note", params={"text": "b"})
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+        assert res.json()["meta"] == {"succeed": 2, "failed": 0}
+        assert "SELECT" not in statements
+        res = await client.get("/note")
+        assert res.json()["data"]["list"] == [{"id": 4, "text": "c"}]
+
+    serve([ExtendedRouter(Note)], test, notes=("a", "b", "b", "c"))
+
+
+def test_result_cache_is_invalidated_by_the_writes():
+    async def test(client, generator, engine):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split()[0])
+
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        for _ in range(2):
+            res = await client.get("/note/one", params={"id": 1})
+            assert res.json()["data"] == {"id": 1, "text": "a"}
+            res = await client.get("/note")
+            assert res.json()["meta"]["total"] == 3
+        assert statements.count("SELECT") == 3
+        res = await client.put("/note/1", json={"text": "new"})
+        assert res.json()["status"]["code"] == 0
+        res = await client.get("/note/one", params={"id": 1})
+        assert res.json()["data"] == {"id": 1, "text": "new"}
+        res = await client.post("/note/one", json={"text": "d"})
+        assert res.json()["status"]["code"] == 0
+        res = await client.get("/note")
+        assert res.json()["meta"]["total"] == 4
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    serve([ExtendedRouter(Note, cache=MemoryCacheBackend())], test)
+
+
+def test_etag_answers_not_modified():
+    async def test(client, generator, engine):
+        res = await client.get("/note", params={"limit": 2})
+        etag = res.headers["ETag"]
+        assert res.headers["Cache-Control"] == "private, max-age=5"
+        assert res.json()["data"]["list"] == [{"id": 1, "text": "a"}, {"id": 2, "text": "b"}]
+        res = await client.get("/note", params={"limit": 2}, headers={"If-None-Match": etag})
+        assert res.status_code == 304
+        assert res.content == b""
+        assert res.headers["ETag"] == etag
+        res = await client.get("/note", params={"limit": 3}, headers={"If-None-Match": etag})
+        assert res.status_code == 200
+        await client.put("/note/1", json={"text": "new"})
+        res = await client.get("/note", params={"limit": 2}, headers={"If-None-Match": etag})
+        assert res.status_code == 200
+        assert res.headers["ETag"] != etag
+        res = await client.get("/note", params={"cursor": "bogus"})
+        assert res.json()["status"]["code"] != 0
+        assert "ETag" not in res.headers
+
+    router = ExtendedRouter(
+        Note,
+        read_many=SimpleEndpoint(etag=True, cache_control="private, max-age=5"),
+        read_one=SimpleEndpoint(path="/one", etag=True),
+    )
+    serve([router], test)
+
+
+def test_lazy_router_is_set_up_on_its_first_request():
+    async def test(client, generator, engine):
+        routes = generator.app.router.routes
+        assert [getattr(r, "lazyPlaceholder", False) for r in routes].count(True) == 1
+        assert "/note/one" not in [getattr(r, "path", None) for r in routes]
+        res = await client.get("/note/one", params={"id": 2})
+        assert res.json()["data"] == {"id": 2, "text": "b"}
+        assert not any(getattr(r, "lazyPlaceholder", False) for r in routes)
+        assert "/note/one" in [getattr(r, "path", None) for r in routes]
+        res = await client.get("/note")
+        assert res.json()["meta"]["total"] == 3
+
+    serve([ExtendedRouter(Note)], test, lazy=True)
+
+
+def test_metrics_count_the_operations_and_their_phases():
+    async def test(client, generator, engine):
+        generator.mount_metrics()
+        await client.get("/note")
+        await client.get("/note")
+        await client.get("/note/one", params={"id": 1})
+        await client.get("/note", params={"cursor": "bogus"})
+        res = await client.get("/metrics")
+        assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+        lines = res.text.splitlines()
+        assert 'simplecrud_operations_total{table="note",operation="read_many"} 3' in lines
+        assert 'simplecrud_operations_total{table="note",operation="read_one"} 1' in lines
+        assert 'simplecrud_responses_total{table="note",operation="read_many",code="100"} 1' in lines
+        assert 'simplecrud_rows_total{table="note",operation="read_many"} 6' in lines
+        assert 'simplecrud_phase_seconds_count{table="note",operation="read_many",phase="total"} 3' in lines
+        assert any(line.startswith(
+            'simplecrud_phase_seconds_count{table="note",operation="read_many",phase="query"}'
+        ) for line in lines)
+
+    serve([ExtendedRouter(Note)], test, metrics=Metrics())
+
+
+def test_sql_statement_count_headers_and_budget(caplog):
+    async def test(client, generator, engine):
+        generator.count_sql_statements(engine, budget=5)
+        res = await client.get("/note/one", params={"id": 1})
+        assert res.headers["X-SQL-Count"] == "1"
+        assert float(res.headers["X-SQL-Time"]) >= 0
+        res = await client.get("/note", params={"countStrategy": "window"})
+        assert res.headers["X-SQL-Count"] == "1"
+        assert "budget" not in caplog.text
+        res = await client.get("/note")
+        assert res.headers["X-SQL-Count"] == "2"
+        assert "GET /note executed 2 SQL statements, its budget is 1" in caplog.text
+
+    router = ExtendedRouter(Note, read_many=SimpleEndpoint(sql_budget=1))
+    serve([router], test)
+
+
+def test_batch_read_and_coalesced_read_one():
+    async def test(client, generator, engine):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        res = await client.get("/note/batch", params={"ids": "3,1,9"})
+        assert res.json()["data"] == {
+            "list": [{"id": 3, "text": "c"}, {"id": 1, "text": "a"}], "missing": [9]
+        }
+        assert len(statements) == 1
+        statements.clear()
+        responses = await asyncio.gather(*[
+            client.get("/note/one", params={"id": i}) for i in [1, 2, 3, 9]
+        ])
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+        assert [r.json()["data"] for r in responses] == [
+            {"id": 1, "text": "a"}, {"id": 2, "text": "b"}, {"id": 3, "text": "c"}, None
+        ]
+        selects = [s for s in statements if s.startswith("SELECT")]
+        assert len(selects) == 1 and " IN " in selects[0]
+
+    serve([ExtendedRouter(Note, coalesce_window=0.05)], test)